@@ -6,9 +6,11 @@ or within a wdata / school_wdata class or method
 
 from wdata import *
 from school_wdata import *
+set_display_options()
 
-df = pd.read_csv('2016 School Explorer.csv')
-data = SchoolData(df=df,figwidth=11,figheight=7,font_size=16)
+df = SchoolSchema().read_csv('2016 School Explorer.csv', silence=False)
+data = SchoolData(df=df,figwidth=11,figheight=7,font_size=16,
+    cache=ArtifactCache())
 
 data.df['In Need Score'].describe()
 
@@ -24,7 +26,7 @@ data.grades_bargraph('School Income Estimate',
 # drop_cols = []
 # data.df.head()
 # #
-# data.df.sort_values('In Need Score').tail()
+# data.top_in_need(5)
 #
 # data.df['In Need Score'].describe()
 #
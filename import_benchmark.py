@@ -0,0 +1,52 @@
+"""
+Times importing wdata and school_wdata in fresh interpreters, against the same
+imports with matplotlib and scikit-learn loaded up front the way they used to
+be, and reports the memory used and whether the heavy packages were loaded
+
+python import_benchmark.py [repeats]
+"""
+
+import statistics
+import subprocess
+import sys
+
+SNIPPET = """
+import resource, sys, time
+start = time.perf_counter()
+%s
+seconds = time.perf_counter() - start
+print(seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+      'matplotlib' in sys.modules, 'sklearn' in sys.modules)
+"""
+
+CASES = {
+    'wdata, school_wdata': 'import wdata, school_wdata',
+    '+ matplotlib, sklearn': 'import wdata, school_wdata\n'
+        'import matplotlib.pyplot, sklearn.impute, sklearn.neighbors',
+}
+
+def measure(code, repeats):
+    """
+    Runs code in repeats fresh interpreters
+
+    :return: Median seconds, median max RSS in MB, and whether matplotlib and
+        scikit-learn were imported
+    """
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', SNIPPET % code],
+            capture_output=True, text=True, check=True).stdout.split()
+        runs.append(out)
+    seconds = statistics.median(float(run[0]) for run in runs)
+    # ru_maxrss is in kilobytes on Linux
+    rss = statistics.median(int(run[1]) for run in runs) / 1024
+
+    return seconds, rss, runs[0][2], runs[0][3]
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print('%-24s %10s %10s %12s %9s' % ('import', 'seconds', 'RSS MB',
+        'matplotlib', 'sklearn'))
+    for name, code in CASES.items():
+        print('%-24s %10.3f %10.1f %12s %9s' % ((name,) +
+            measure(code, repeats)))
@@ -0,0 +1,114 @@
+"""
+Load tests the local scoring service from serve.py with concurrent clients
+on keep-alive connections, and prints the latency of each endpoint with its
+p50 and p99 and a histogram
+
+python load_test.py --clients 32 --requests 5000 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import numpy as np
+
+async def request(reader, writer, method, path, body=None):
+    """
+    Sends one HTTP/1.1 request on an open connection
+
+    :return: Status code and the decoded JSON response
+    """
+    payload = json.dumps(body).encode() if body is not None else b''
+    writer.write(b'%s %s HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d'
+        b'\r\n\r\n' % (method.encode(), path.encode(), len(payload)) + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, value = line.decode().split(':', 1)
+        if name.lower() == 'content-length':
+            length = int(value)
+
+    return status, json.loads(await reader.readexactly(length))
+
+def make_requests(codes, weights, districts):
+    """
+    Returns the requests a client picks from, by endpoint
+    """
+    def whatif():
+        scaled = {name: weight * random.uniform(0.8, 1.2)
+                  for name, weight in weights.items()}
+        return 'POST', '/whatif', {'weights': scaled,
+            'codes': random.sample(codes, 3)}
+
+    return {
+        'score': lambda: ('GET', '/score?code=%s' % random.choice(codes),
+                          None),
+        'top': lambda: ('GET', '/top?k=10&district=%s' %
+                        random.choice(districts), None),
+        'groups': lambda: ('GET', '/groups?by=City', None),
+        'whatif': whatif,
+    }
+
+async def client(host, port, count, requests, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    for _ in range(count):
+        name = random.choice(list(requests))
+        start = time.perf_counter()
+        status, _ = await request(reader, writer, *requests[name]())
+        if status != 200:
+            name += ' (failed)'
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+    writer.close()
+
+def histogram(latencies, width=40):
+    """
+    Prints a histogram of latencies in milliseconds, on log-spaced buckets
+    """
+    ms = np.asarray(latencies) * 1000
+    edges = np.geomspace(max(ms.min(), 0.01), ms.max() * 1.0001, 9)
+    counts, edges = np.histogram(ms, bins=edges)
+    for count, low, high in zip(counts, edges, edges[1:]):
+        print('  %9.2f - %9.2f ms %7d %s' % (low, high, count,
+            '#' * int(round(width * count / counts.max()))))
+
+async def main(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, top = await request(reader, writer, 'GET', '/top?k=100000')
+    _, weights = await request(reader, writer, 'GET', '/weights')
+    writer.close()
+    codes = [school['Location Code'] for school in top]
+    districts = sorted({school['District'] for school in top})
+    requests = make_requests(codes, weights, districts)
+
+    latencies = {}
+    per_client = args.requests // args.clients
+    start = time.perf_counter()
+    await asyncio.gather(*[client(args.host, args.port, per_client, requests,
+        latencies) for _ in range(args.clients)])
+    seconds = time.perf_counter() - start
+
+    print('%d requests from %d clients in %.2f seconds, %.0f requests/sec' %
+          (per_client * args.clients, args.clients, seconds,
+           per_client * args.clients / seconds))
+    for name, values in sorted(latencies.items()):
+        values = np.asarray(values) * 1000
+        print('%-8s %6d requests   p50 %8.2f ms   p99 %8.2f ms   max %8.2f '
+              'ms' % (name, len(values), np.percentile(values, 50),
+              np.percentile(values, 99), values.max()))
+        histogram(values / 1000)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load tests serve.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(main(args))
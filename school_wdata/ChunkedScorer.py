@@ -0,0 +1,298 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from wdata import Data
+from .SchoolData import SchoolData
+from .SchoolSchema import SchoolSchema
+
+class ChunkedScorer:
+    """
+    Scores a School Explorer file that is too large to hold in memory, the
+    same way as SchoolData, in two streaming passes over chunks of its rows.
+    The first pass collects everything a school's score depends on from the
+    rest of the data: minimums and maximums, District and City aggregates,
+    and counts of the values medians and modes are taken from. The second
+    pass transforms and scores each chunk and appends it to the output
+
+    Memory is bounded by the chunk size, the number of Districts and Cities
+    and the number of distinct values of the imputed columns
+    """
+    def __init__(self, path, chunksize=50000, figwidth=11, figheight=7,
+        silence=False):
+        """
+        Constructor method for ChunkedScorer
+
+        :param path: School Explorer format CSV file to score
+        :param chunksize: The number of schools held in memory at once
+        :param silence: Whether or not to print the progress of each pass
+        """
+        self.path = path
+        self.chunksize = chunksize
+        self.figwidth = figwidth
+        self.figheight = figheight
+        self.silence = silence
+        self.schema = SchoolSchema()
+        # Holds the configuration of the ETL process, and never any rows
+        self.template = SchoolData(pd.DataFrame(), figwidth, figheight,
+            subset=True)
+        # Shared by every chunk so their masks line up
+        self._grade_bits = dict(self.template._grade_bits)
+        self.sources = None
+        self.stats = None
+
+        return
+
+    def run(self, output, columns=None):
+        """
+        Runs both passes, writing the scored schools to output
+
+        :param output: CSV file to write
+        :param columns: Columns written for each school, see score()
+        """
+        self.collect()
+        self.score(output, columns)
+
+        return
+
+    def chunks(self):
+        """
+        Returns an iterator over chunks of the School Explorer file
+        """
+        return self.schema.read_csv(self.path, chunksize=self.chunksize)
+
+    def load_sources(self):
+        """
+        Reads the grocery store, subway and car-accident files once for every
+        chunk to be joined to
+        """
+        self.sources = {
+            'retail_zips': self.template._load_retail(),
+            'stations': self.template._load_stations(),
+            'crash_counts': self.template._load_crashes(silence=self.silence)}
+
+        return
+
+    def transform_chunk(self, chunk):
+        """
+        Joins the enrichment files to a chunk and runs the steps of the ETL
+        process that only depend on each row
+
+        :param chunk: DataFrame of schools in the School Explorer format
+        :return: SchoolData subset of the transformed chunk
+        """
+        if self.sources is None:
+            self.load_sources()
+        part = SchoolData(chunk, self.figwidth, self.figheight, subset=True)
+        part.retail_read(retail_zips=self.sources['retail_zips'])
+        part._metro_read(stations=self.sources['stations'])
+        part._car_read(crash_counts=self.sources['crash_counts'])
+        part._transform_row_local(self._grade_bits)
+
+        return part
+
+    def _group_aggs(self):
+        """
+        Returns the aggregations of _agg_dict that can be merged across
+        chunks. 'mode' aggregates only serve the plots and are left out
+        """
+        return {col: agg for col, agg in self.template._agg_dict.items()
+                if agg in ['count', 'sum', 'mean']}
+
+    def chunk_stats(self, part):
+        """
+        Collects the statistics of one transformed chunk. Everything
+        collected merges with merge_stats(), in any order
+
+        :param part: SchoolData from transform_chunk()
+        :return: Dictionary of the chunk's statistics
+        """
+        t = self.template
+        df = part.df
+        # Bin bounds and the value counts of imputed columns
+        stats = part._partial_stats()
+        stats['rows'] = len(df)
+        stats['groups'] = {}
+        for col in [item['pre_col'] for item in t._in_need_dict.values()]:
+            stats['bounds'][col] = (df[col].min(), df[col].max())
+        # Only values above greater_than are normalized, 0 means no data
+        col = t._income_need_dict['col']
+        reported = df[col][df[col] >= t._income_need_dict['greater_than']]
+        stats['income'] = (reported.min(), reported.max())
+
+        aggs = self._group_aggs()
+        summed = [col for col, agg in aggs.items() if agg != 'count']
+        for col in ['District', 'City']:
+            grouped = df.groupby(col, observed=True)
+            stats['groups'][col] = {'sum': grouped[summed].sum(),
+                                    'count': grouped[list(aggs)].count(),
+                                    'size': grouped.size()}
+
+        return stats
+
+    @staticmethod
+    def merge_stats(total, stats):
+        """
+        Merges the statistics of a chunk into the total so far
+
+        :param total: Merged statistics, or None for the first chunk
+        :param stats: Statistics from chunk_stats()
+        :return: The merged statistics
+        """
+        if total is None:
+            return stats
+
+        SchoolData._merge_partial_stats(total, stats)
+        total['rows'] += stats['rows']
+        total['income'] = (np.fmin(total['income'][0], stats['income'][0]),
+                           np.fmax(total['income'][1], stats['income'][1]))
+        for col, parts in stats['groups'].items():
+            for key, value in parts.items():
+                total['groups'][col][key] = total['groups'][col][key].add(
+                    value, fill_value=0)
+
+        return total
+
+    def finish_stats(self, total):
+        """
+        Turns merged statistics into what the second pass scores with:
+        medians, modes, bin edges, In Need bounds and the District and City
+        aggregates with their bins
+
+        :param total: Statistics merged from every chunk
+        :return: Dictionary of the global statistics
+        """
+        t = self.template
+        # Bin edges, medians and modes
+        stats = t._global_stats(total)
+        stats['rows'] = total['rows']
+
+        # Imputing with the median never moves a minimum or maximum, unless
+        # every value was missing
+        bounds = {}
+        for item in t._in_need_dict.values():
+            low, high = total['bounds'][item['pre_col']]
+            median = stats['medians'].get(item['pre_col'], np.nan)
+            bounds[item['pre_col']] = (np.fmin(low, median),
+                                       np.fmax(high, median))
+        bounds[t._income_need_dict['col']] = total['income']
+        stats['bounds'] = bounds
+
+        aggs = self._group_aggs()
+        for col, attr, bin_dict in [('District', 'dis', t._dis_bin_dict),
+                                    ('City', 'cit', t._cit_bin_dict)]:
+            parts = total['groups'][col]
+            table = {}
+            for agg_col, agg in aggs.items():
+                count = parts['count'][agg_col]
+                if agg == 'count':
+                    table[agg_col] = count
+                    continue
+                summed = parts['sum'][agg_col]
+                # Missing values of imputed columns count as the median
+                if agg_col in stats['medians']:
+                    missing = parts['size'] - count
+                    summed = summed + missing * stats['medians'][agg_col]
+                    count = count + missing
+                table[agg_col] = summed if agg == 'sum' else summed / count
+            table = pd.DataFrame(table).rename(columns={'School Name':
+                'Count'})
+            table.index.name = col
+            group_data = Data(table, self.figwidth, self.figheight)
+            group_data.dict_fun_run(bin_dict, group_data._column_bin)
+            stats[attr] = group_data
+
+        return stats
+
+    def collect(self):
+        """
+        The first pass, collecting the global statistics into self.stats
+        """
+        start = time.perf_counter()
+        total = None
+        for chunk in self.chunks():
+            # A file with only a header still reads as one empty chunk
+            if len(chunk) == 0:
+                continue
+            total = self.merge_stats(total, self.chunk_stats(
+                self.transform_chunk(chunk)))
+        if total is None:
+            raise ValueError('No schools to score in %s' % self.path)
+        self.stats = self.finish_stats(total)
+
+        if self.silence is False:
+            seconds = time.perf_counter() - start
+            print('Pass 1: %d schools in %.2f seconds (%d schools/sec)' %
+                (total['rows'], seconds, total['rows'] / seconds))
+
+        return
+
+    def score_chunk(self, part):
+        """
+        Runs the rest of the ETL process over a transformed chunk with the
+        global statistics, then scores it
+
+        :param part: SchoolData from transform_chunk()
+        :return: Array of the chunk's In Need Scores before they are
+            normalized from 0 to 100
+        """
+        t = self.template
+        # Bins are cut before imputation, the same as the ETL process
+        part._cut_bins(self.stats['edges'])
+        part._impute_global(self.stats['medians'], self.stats['modes'])
+
+        part.attach_cols(self.stats['dis'], [item['new_col'] for item in
+            t._dis_bin_dict.values()], on='District', silence=True)
+        part.attach_cols(self.stats['cit'], [item['new_col'] for item in
+            t._cit_bin_dict.values()], on='City', silence=True)
+        part._in_need_bounds = self.stats['bounds']
+
+        return part.raw_in_need(part.df.index)
+
+    def score(self, output, columns=None):
+        """
+        The second pass, scoring every chunk and appending it to output.
+        Normalizing the scores from 0 to 100 needs the lowest and highest of
+        them all, so the chunks are written to a temporary file first and
+        normalized while they are copied to output
+
+        :param output: CSV file to write
+        :param columns: Columns of the transformed data written for each
+            school, Location Code, School Name, District, City and In Need
+            Score if None
+        """
+        if self.stats is None:
+            self.collect()
+        if columns is None:
+            columns = ['Location Code', 'School Name', 'District', 'City',
+                       'In Need Score']
+        start = time.perf_counter()
+        raw_path = output + '.raw'
+        low, high = np.inf, -np.inf
+        for index, chunk in enumerate(self.chunks()):
+            part = self.transform_chunk(chunk)
+            raw = self.score_chunk(part)
+            scored = part.df[[col for col in columns
+                              if col != 'In Need Score']].copy()
+            scored['Raw In Need'] = raw
+            scored.to_csv(raw_path, mode='w' if index == 0 else 'a',
+                header=index == 0, index=False)
+            # Schools without a score are left out, the same as SchoolData
+            low = np.nanmin(np.append(raw, low))
+            high = np.nanmax(np.append(raw, high))
+            del part, scored
+
+        for index, chunk in enumerate(pd.read_csv(raw_path,
+            chunksize=self.chunksize)):
+            chunk['In Need Score'] = (chunk.pop('Raw In Need') - low) / \
+                (high - low) * 100
+            chunk[columns].to_csv(output, mode='w' if index == 0 else 'a',
+                header=index == 0, index=False)
+        os.remove(raw_path)
+
+        if self.silence is False:
+            seconds = time.perf_counter() - start
+            print('Pass 2: %d schools in %.2f seconds (%d schools/sec)' %
+                (self.stats['rows'], seconds, self.stats['rows'] / seconds))
+
+        return
@@ -0,0 +1,123 @@
+import re
+
+class ColumnCatalog:
+    """
+    Parses every 'Grade N {Math|ELA} [4s - ]{group}[ Tested]' header of the
+    School Explorer into its fields once, and indexes the columns by each of
+    those fields so selections never scan every column
+    """
+    pattern = re.compile(r'^Grade (\d+) (Math|ELA)( 4s)? - (.+?)( Tested)?$')
+
+    def __init__(self, columns):
+        """
+        Constructor method for ColumnCatalog
+
+        :param columns: The columns of the DataFrame, any that do not match
+            the pattern are ignored
+        """
+        # Column: (grade, subject, fours, group, tested)
+        self.fields = {}
+        # (grade, subject, fours, group, tested): column
+        self._keys = {}
+        # Every value seen for each field, in the order they were first seen
+        self.values = {'grade': {}, 'subject': {}, 'fours': {}, 'group': {},
+                       'tested': {}}
+        # Field: {value: set of the keys with that value}
+        self._index = {field: {} for field in self.values}
+        self.add(columns)
+
+        return
+
+    def add(self, columns):
+        """
+        Parses and indexes columns
+
+        :param columns: Columns to add, any that do not match are ignored
+        """
+        for col in columns:
+            match = self.pattern.match(col)
+            if match is None:
+                continue
+            key = (int(match.group(1)), match.group(2),
+                   match.group(3) is not None, match.group(4),
+                   match.group(5) is not None)
+            self.fields[col] = key
+            self._keys[key] = col
+            for field, value in zip(self.values, key):
+                self.values[field].setdefault(value)
+                self._index[field].setdefault(value, set()).add(key)
+
+        return
+
+    def remove(self, columns):
+        """
+        Removes columns from the catalog, such as after they are dropped
+
+        :param columns: Columns to remove, any not in the catalog are ignored
+        """
+        for col in columns:
+            key = self.fields.pop(col, None)
+            if key is not None:
+                del self._keys[key]
+                for field, value in zip(self.values, key):
+                    self._index[field][value].discard(key)
+
+        return
+
+    def match_groups(self, prefix):
+        """
+        Returns every group that starts with prefix
+
+        >>> catalog.match_groups('Asian')
+        ['Asian or Pacific Islander']
+        """
+        return [group for group in self.values['group']
+                if group.startswith(prefix)]
+
+    def select(self, grades=None, subjects=None, groups=None, fours=None,
+        tested=None):
+        """
+        Returns the columns that match every field given, in grade, subject
+        and group order. Fields left as None match any value
+
+        :param grades: List of grades
+        :param subjects: List of subjects, 'Math' and / or 'ELA'
+        :param groups: List of student groups, such as 'All Students'
+        :param fours: Whether the columns count 4s or students
+        :param tested: Whether the columns end in ' Tested'
+        :return: A list of columns
+
+        >>> catalog.select(grades=[6, 7, 8], subjects=['Math'],
+        ...     groups=['Black or African American'], fours=True)
+        ['Grade 6 Math 4s - Black or African American',
+         'Grade 7 Math 4s - Black or African American',
+         'Grade 8 Math 4s - Black or African American']
+        """
+        # The keys holding any of the values chosen for each field given,
+        # intersected from the smallest, so the work follows the result
+        matches = []
+        order = {}
+        for field, chosen in zip(self.values, [grades, subjects, fours,
+                                               groups, tested]):
+            if chosen is None:
+                chosen = list(self.values[field])
+                if field == 'grade':
+                    chosen = sorted(chosen)
+            else:
+                if not isinstance(chosen, list):
+                    chosen = [chosen]
+                matches.append(set().union(*[self._index[field].get(value,
+                    set()) for value in chosen]))
+            # Position of each value, so columns come back in that order
+            order[field] = {}
+            for position, value in enumerate(chosen):
+                order[field].setdefault(value, position)
+        if matches:
+            matches.sort(key=len)
+            keys = matches[0].intersection(*matches[1:])
+        else:
+            keys = self._keys
+
+        positions = list(order.values())
+        return [self._keys[key] for key in sorted(keys, key=lambda key:
+            [position[value] for position, value in zip(positions, key)])]
@@ -1,47 +1,707 @@
 from .SchoolGraph import SchoolGraph
 from .SchoolOrganize import SchoolOrganize
+from .SchoolSchema import SchoolSchema
+from wdata import Data
+import hashlib
+import json
 import numpy as np
+import os
 import pandas as pd
-from sklearn import preprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# The enrichment files, read once and sent to each worker process
+_sources = None
+
+def _init_partition_worker(sources):
+    global _sources
+    _sources = sources
+
+def _transform_partition(rows, positions):
+    """
+    Runs the steps of the ETL process that only depend on each row over a
+    partition of the schools, in a worker process
+
+    :param rows: DataFrame of the partition's schools
+    :param positions: The positions of the rows in the whole data
+    :return: The transformed DataFrame indexed by positions, its parse
+        errors, the columns to drop and its partial statistics
+    """
+    part = SchoolData(rows, 11, 7, subset=True)
+    part.retail_read(retail_zips=_sources['retail_zips'])
+    part._metro_read(stations=_sources['stations'])
+    part._car_read(crash_counts=_sources['crash_counts'])
+    # The same labels the rows have in the whole data after its merges
+    part.df.index = positions
+    part._rename_cols()
+    part._type_correction()
+    drop_cols = part._row_features(set())
+
+    return part.df, part.parse_errors, drop_cols, part._partial_stats()
 
 class SchoolData(SchoolOrganize, SchoolGraph):
     """
     A class designed specifically to deal with this dataset. Mostly dedicated
     to calling methods upon creation to sort the data how I want.
     """
-    def __init__(self, df, figwidth, figheight,subset=False,**kwargs):
+    def __init__(self, df, figwidth, figheight,subset=False, cache=None,
+        lazy=False, workers=3, processes=None, **kwargs):
         """
         Constructor method for SchoolData
+
+        :param cache: ArtifactCache to store the output of expensive stages
+            in, every stage is recomputed if None
+        :param lazy: Skip the ETL process, columns are instead computed along
+            with the columns they depend on when asked for through feature()
+        :param workers: The number of enrichment files read at the same time
+        :param processes: The number of processes the steps of the ETL
+            process that only depend on each row are split across by
+            District, see _transform_partitioned(). Stages are not cached
+            when it is set
         """
         super().__init__(df,**kwargs)
+        self.cache = cache
+        self.schema = SchoolSchema()
+        self._input_hash = None
+        # Whether self.df was loaded from a snapshot, and so has read-only
+        # categorical codes
+        self._mapped = False
         # A collection of columns that will be created and summed based on the
         # arguments sent into columnGenerator
         # IDEA: Will a list of dictionaries be faster than a nested dictionary
         # where the number representation doesn't matter
-        if not subset:
-            self.retail_read()
-            self.metro_read()
-            self.car_read()
-            self._transform_data()
+        if lazy:
+            self._rename_cols()
+            self._init_feature_graph()
+        elif not subset:
+            # Kept so save_snapshot() can tell which data it was built from
+            self._input_hash = self._frame_hash(self.df)
+            if processes is not None:
+                self._transform_partitioned(processes, workers=workers)
+            else:
+                self.read_sources(workers=workers)
+                self.run_stage('_transform_data')
+            # Instantiate Classes in order to get their information
+            self._init_cit()
+            self._init_dis()
             self._calculate_in_need()
+            # The bin and score columns added since are not aggregated
+            self._stamp_groups(['dis', 'cit'])
 
-    def retail_read(self):
+    def feature(self, col):
         """
-        Reads in Grocery Store Data and merges with dataset
+        Returns a column of the data. If SchoolData was created with
+        lazy=True, the column is computed first along with only the columns
+        it depends on, each of which is only ever computed once
+
+        :param col: The column, or list of columns, to return
+        :return: The column as a Series, or a DataFrame for a list
+
+        >>> data = SchoolData(df, 11, 7, lazy=True)
+        >>> data.feature('Total 4 %') # Only runs the sums it is divided from
         """
-        retail_food_df = pd.read_csv('Retail_Food_Stores.csv')
+        if isinstance(col, list):
+            for item in col:
+                self._compute_feature(item)
+        else:
+            self._compute_feature(col)
 
-        retail_food_df['Establishment Type'] = [ i.strip() \
-            for i in retail_food_df['Establishment Type'] ]
-        retail_zips = pd.DataFrame(retail_food_df[retail_food_df[\
-            'Establishment Type'] == \
-            'A'].groupby('Zip Code').count().loc[:,'County'])
-        retail_zips = retail_zips.reset_index()
-        retail_zips.columns = ['Zip', 'Grocery Store Count']
+        return self.df[col]
 
-        self.df = pd.merge(self.df, retail_zips, on = 'Zip', how = 'left')
+    def _compute_feature(self, col):
+        """
+        Runs the node of the feature graph that creates col, after the nodes
+        of the columns it depends on
+        """
+        node = self._feature_cols.get(col)
+        # Raw columns and columns that have already been computed
+        if node is None or node in self._computed_nodes:
+            return
 
-        del retail_food_df
+        for dep in self._feature_nodes[node]['deps']:
+            self._compute_feature(dep)
+        for fun, kwargs in self._feature_nodes[node]['funs']:
+            fun(**kwargs)
+        self._computed_nodes.add(node)
+
+        return
+
+    def run_stage(self, stage, **kwargs):
+        """
+        Runs an expensive ETL stage from self._stage_dict. If self.cache holds
+        output for the same input files, input columns and stage version, it
+        is loaded by Location Code instead of running the stage
+
+        :param stage: Name of the method to run
+        :param kwargs: Sent to the stage's method when it runs
+        """
+        if self.cache is None:
+            getattr(self, stage)(**kwargs)
+            return
+
+        info = self._stage_dict[stage]
+        # Stages without output columns replace the whole DataFrame
+        whole_df = info['output_cols'] is None
+        # Attributes the stage sets besides self.df, stored along with it
+        attrs = info.get('attrs', [])
+        key = self._stage_key(stage)
+
+        artifact = self.cache.load(key)
+        if artifact is None:
+            getattr(self, stage)(**kwargs)
+            if whole_df:
+                artifact = self.df
+            else:
+                artifact = self.df.set_index('Location Code')[
+                    info['output_cols']]
+            if attrs:
+                artifact = (artifact, {attr: getattr(self, attr)
+                                       for attr in attrs})
+            self.cache.save(key, artifact)
+        else:
+            if attrs:
+                artifact, values = artifact
+                for attr, value in values.items():
+                    setattr(self, attr, value)
+            if whole_df:
+                self.df = artifact
+            else:
+                artifact = artifact.reindex(self.df['Location Code'])
+                for col in info['output_cols']:
+                    self.df[col] = artifact[col].values
+
+        del artifact
+
+        return
+
+    def _stage_key(self, stage):
+        """
+        Returns the self.cache key of a stage for the current data
+        """
+        info = self._stage_dict[stage]
+        if info['output_cols'] is None:
+            inputs = self.df
+        else:
+            inputs = self.df[['Location Code'] + info['input_cols']]
+
+        return self.cache.key(stage, info['version'], info['files'], inputs)
+
+    def read_sources(self, workers=3):
+        """
+        Reads the grocery store, subway and car-accident files at the same
+        time in a pool of worker threads, then joins each of them to self.df
+        in a fixed order, so the result is the same as reading them one after
+        another. Files of stages held in self.cache are not read
+
+        :param workers: The number of files read at the same time, 1 reads
+            them one after another
+        """
+        # Stage: (keyword the stage takes, method that reads its file without
+        # touching self.df)
+        loaders = {'retail_read': ('retail_zips', self._load_retail),
+                   '_metro_read': ('stations', self._load_stations),
+                   '_car_read': ('crash_counts', self._load_crashes)}
+        if self.cache is not None:
+            loaders = {stage: loader for stage, loader in loaders.items()
+                       if not self.cache.contains(self._stage_key(stage))}
+
+        if workers > 1 and len(loaders) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {stage: pool.submit(load)
+                           for stage, (_, load) in loaders.items()}
+                loaded = {stage: future.result()
+                          for stage, future in futures.items()}
+        else:
+            loaded = {stage: load() for stage, (_, load) in loaders.items()}
+
+        for stage in ['retail_read', '_metro_read', '_car_read']:
+            if stage in loaded:
+                self.run_stage(stage, **{loaders[stage][0]: loaded[stage]})
+            else:
+                self.run_stage(stage)
+        del loaded
+
+        return
+
+    def _transform_partitioned(self, processes, workers=3):
+        """
+        Runs the same steps as read_sources() and _transform_data(), with the
+        steps that only depend on each row run over partitions of whole
+        Districts in a pool of processes. Each partition also returns partial
+        statistics, merged into the bin edges, medians and modes the rest of
+        the steps use, so the result is identical to running them in order
+
+        :param processes: The number of processes, and partitions
+        :param workers: The number of enrichment files read at the same time
+        """
+        loaders = {'retail_zips': self._load_retail,
+                   'stations': self._load_stations,
+                   'crash_counts': self._load_crashes}
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            futures = {key: pool.submit(load) for key, load in loaders.items()}
+            sources = {key: future.result() for key, future in futures.items()}
+
+        parts = self._district_partitions(processes)
+        with ProcessPoolExecutor(max_workers=processes,
+            initializer=_init_partition_worker, initargs=(sources,)) as pool:
+            results = list(pool.map(_transform_partition,
+                [self.df.iloc[positions] for positions in parts], parts))
+        del sources
+
+        # Back in the order of the data, with the index its merges leave
+        self.df = pd.concat([result[0] for result in results]).sort_index()
+        self.df.index = pd.RangeIndex(len(self.df))
+        self._catalog = None
+        # Parse errors in the order parse_columns() finds them
+        order = {col: rank for rank, col in enumerate([col for kind in
+            self._parsers for col in self._type_dict
+            if self._type_dict[col] == kind])}
+        errors = pd.concat([result[1] for result in results],
+            ignore_index=True)
+        self.parse_errors = errors.iloc[np.lexsort((errors['index'].values,
+            errors['column'].map(order).values))].reset_index(drop=True)
+        drop_cols = set(self._unused_cols).union(*[result[2]
+            for result in results])
+        total = None
+        for result in results:
+            total = self._merge_partial_stats(total, result[3])
+        stats = self._global_stats(total)
+        del results
+
+        # The rest of _transform_data(), in the same order
+        self._cut_bins(stats['edges'])
+        self.drop_cols([i for i in drop_cols if 'All Students' not in i])
+        self._grade_combination()
+        self._record_missing()
+        self._impute_global(stats['medians'], stats['modes'])
+        self._grade_bools()
+
+        return
+
+    def _district_partitions(self, parts):
+        """
+        Splits the positions of self.df into at most parts partitions of
+        whole Districts, with about the same number of schools in each
+
+        :return: List of arrays of positions, in order
+        """
+        # Schools without a District are one more group (code -1)
+        codes = pd.factorize(self.df['District'])[0] + 1
+        sizes = np.bincount(codes)
+        loads = np.zeros(parts)
+        partition = np.zeros(len(sizes), dtype=int)
+        # The largest Districts are placed first, each in the emptiest part
+        for group in np.argsort(-sizes, kind='stable'):
+            partition[group] = loads.argmin()
+            loads[partition[group]] += sizes[group]
+        partition = partition[codes]
+
+        return [np.flatnonzero(partition == part) for part in range(parts)
+                if (partition == part).any()]
+
+    def save_snapshot(self, path, compression=None,
+        explorer='2016 School Explorer.csv'):
+        """
+        Saves the processed data and its District, City and grade aggregates
+        to a folder of Feather (Arrow IPC) files, along with hashes of
+        everything they were built from. Requires pyarrow
+
+        :param path: Folder to save the snapshot in
+        :param compression: None for uncompressed files, the fastest to read,
+            or 'lz4' or 'zstd' for smaller files
+        :param explorer: The School Explorer file the data was read from,
+            checked by every load_snapshot()
+
+        >>> data.save_snapshot('school_snapshot')
+        >>> data = SchoolData.load_snapshot('school_snapshot', df)
+        """
+        from pyarrow import feather
+
+        if self._stale('grade_data_list'):
+            self._init_grade_data_list()
+        grades = pd.concat([grade.df for grade in self.grade_data_list],
+            keys=range(len(self.grade_data_list)), names=['Grade', 'Offered'])
+        frame = self.df.assign(**{'Raw In Need': self._raw_in_need})
+        tables = {'frame': frame.reset_index(drop=True),
+                  # Aggregates have a column named after the key they are
+                  # indexed by, so the index is stored as 'Group'
+                  'dis': self.dis.df.rename_axis('Group').reset_index(),
+                  'cit': self._cit_all.rename_axis('Group').reset_index(),
+                  'grades': grades.reset_index(),
+                  # Which cells were imputed, for update()
+                  'missing': self._missing.reset_index(drop=True)}
+
+        os.makedirs(path, exist_ok=True)
+        for name, table in tables.items():
+            feather.write_feather(table, os.path.join(path, name + '.feather'),
+                compression=compression or 'uncompressed')
+        files = {file: self._file_stamp(file) for file in
+                 dict.fromkeys(file for info in self._stage_dict.values()
+                               for file in info['files'])}
+        meta = {'version': 3, 'input_hash': self._input_hash,
+                'explorer': {explorer: self._file_stamp(explorer)},
+                'stages': {stage: info['version'] for stage, info in
+                           self._stage_dict.items()},
+                'files': files, 'index': self.df.index.tolist(),
+                'grade_bits': self._grade_bits}
+        # Written last, so a half written snapshot is never loaded
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        return
+
+    @classmethod
+    def load_snapshot(cls, path, df=None, figwidth=11, figheight=7,
+        **kwargs):
+        """
+        Loads data saved by save_snapshot() without running any stage of the
+        ETL process. The Feather files are read through a memory map. Most
+        columns are copied out of it, but categorical columns keep their codes
+        in the Arrow buffers, read-only until update() copies them. Requires
+        pyarrow
+
+        Raises a ValueError if the snapshot is stale: the School Explorer file
+        or another input file or a stage's version changed since it was
+        saved, or df is given and is not the data it was built from
+
+        :param path: Folder the snapshot was saved in
+        :param df: The 2016 School Explorer DataFrame, also checked against
+            the data the snapshot was built from if given
+        :param kwargs: Sent to the SchoolData constructor, such as font_size
+        :return: SchoolData the same as the one that was saved
+        """
+        from pyarrow import feather
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        data = cls(pd.DataFrame(), figwidth, figheight, subset=True,
+            **kwargs)
+        if meta.get('version') != 3:
+            raise ValueError('Stale snapshot %s: saved by an older version' %
+                path)
+        stages = {stage: info['version'] for stage, info in
+                  data._stage_dict.items()}
+        if meta['stages'] != stages:
+            raise ValueError('Stale snapshot %s: stage versions changed' %
+                path)
+        for file, stamp in meta['files'].items():
+            if not data._same_file(file, stamp):
+                raise ValueError('Stale snapshot %s: %s changed' % (path,
+                    file))
+        for file, stamp in meta['explorer'].items():
+            if not data._same_file(file, stamp):
+                raise ValueError('Stale snapshot %s: the School Explorer file '
+                    '%s changed' % (path, file))
+        if df is not None and cls._frame_hash(df) != meta['input_hash']:
+            raise ValueError('Stale snapshot %s: the School Explorer data '
+                'changed' % path)
+
+        tables = {name: feather.read_table(os.path.join(path,
+            name + '.feather'), memory_map=True).to_pandas()
+            for name in ['frame', 'dis', 'cit', 'grades', 'missing']}
+
+        data.df = tables['frame']
+        data.df.index = pd.Index(meta['index'])
+        data._raw_in_need = data.df.pop('Raw In Need')
+        data._missing = tables['missing'].set_index(data.df.index)
+        data._input_hash = meta['input_hash']
+        data._grade_bits = meta['grade_bits']
+        data._mapped = True
+        data._in_need_bounds = data.in_need_bounds()
+        data._in_need_range = (data._raw_in_need.min(),
+            data._raw_in_need.max())
+        data._index_in_need()
+
+        data.dis = Data(tables['dis'].set_index('Group').rename_axis(
+            'District'), figwidth, figheight)
+        data.cit = Data(tables['cit'].set_index('Group').rename_axis('City'),
+            figwidth, figheight)
+        data._set_cit(data.cit.df)
+        grades = tables['grades'].set_index(['Grade', 'Offered'])
+        data.grade_data_list = [Data(grades.loc[grade].rename_axis(None),
+            figwidth, figheight) for grade in grades.index.unique('Grade')]
+        data._stamp_groups(['dis', 'cit', 'grade_data_list'])
+
+        return data
+
+    @staticmethod
+    def _frame_hash(df):
+        """
+        Returns a sha256 hash of a DataFrame's columns and values
+        """
+        sha = hashlib.sha256(','.join(map(str, df.columns)).encode())
+        sha.update(pd.util.hash_pandas_object(df, index=False).values)
+
+        return sha.hexdigest()
+
+    def _file_stamp(self, file):
+        """
+        Returns the size, modification time and sha256 hash of a file
+        """
+        stat = os.stat(file)
+        sha = hashlib.sha256()
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''):
+                sha.update(block)
+
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+                'hash': sha.hexdigest()}
+
+    def _same_file(self, file, stamp):
+        """
+        Returns whether a file matches a stamp from _file_stamp(). The file
+        is only hashed again if its size or modification time changed
+        """
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return False
+        if stat.st_size == stamp['size'] and stat.st_mtime_ns == stamp['mtime']:
+            return True
+
+        return self._file_stamp(file)['hash'] == stamp['hash']
+
+    def update(self, rows):
+        """
+        Updates the data with corrected or added schools without rebuilding
+        it. Only the given rows go through the ETL process, only the Districts
+        and Cities they belong to are re-aggregated, and the In Need Score of
+        other schools is only recomputed if a bin they fall in or a value
+        imputed for them changed, or a global minimum or maximum moved
+
+        Bins are cut and missing values imputed from the values before they
+        were imputed, so the result is the same as rebuilding from every row
+
+        :param rows: DataFrame of schools in the 2016 School Explorer format,
+            matched to the schools in the data by Location Code
+        :return: DataFrame indexed by Location Code of the schools whose
+            score or rank changed, with their old and new score and rank
+        """
+        # Snapshots are copied the first time they change, their categorical
+        # codes are read-only
+        if self._mapped:
+            self.df = self.df.copy()
+            self._raw_in_need = self._raw_in_need.copy()
+            self._missing = self._missing.copy()
+            self._mapped = False
+
+        old_scores = self.df.set_index('Location Code')['In Need Score']
+        cut_bounds = {}
+        for item in self._bin_dict.values():
+            raw = self._unimputed(item['cut_col'])
+            cut_bounds[item['cut_col']] = (raw.min(), raw.max())
+
+        new = self._transform_rows(rows)
+        replaced = self.df['Location Code'].isin(new.df['Location Code'])
+        districts = set(self.df.loc[replaced, 'District']) | \
+            set(new.df['District'])
+        cities = set(self.df.loc[replaced, 'City']) | set(new.df['City'])
+        touched = self._replace_rows(new.df)
+        del new
+
+        imputed = self._update_row_features(touched, cut_bounds)
+        # Group means and modes include the values imputed for other schools
+        districts |= set(self.df.loc[imputed, 'District'])
+        cities |= set(self.df.loc[imputed, 'City'])
+        self.dis.df, dis_changed = self._update_groups('District', districts,
+            self.dis.df, self._dis_bin_dict)
+        self._cit_all, cit_changed = self._update_groups('City', cities,
+            self._cit_all, self._cit_bin_dict)
+        self._bump_version()
+        self._set_cit(self._cit_all)
+
+        old_bounds = self._in_need_bounds
+        self._in_need_bounds = self.in_need_bounds()
+        self._raw_in_need = self._raw_in_need.reindex(self.df.index)
+        if self._in_need_bounds == old_bounds:
+            rows = self.df.index[touched | imputed | dis_changed |
+                cit_changed]
+        else:
+            rows = self.df.index
+        self._raw_in_need[rows] = self.raw_in_need(rows)
+        self._normalize_in_need(rows)
+        # The District and City aggregates were updated above, the grade
+        # aggregates are rebuilt when they are next plotted
+        self._stamp_groups(['dis', 'cit'])
+
+        scores = pd.DataFrame({'Old Score': old_scores,
+            'New Score': self.df.set_index('Location Code')['In Need Score']})
+        # Normalizing again can move a score by a rounding error, which is
+        # neither a change nor allowed to break a tie
+        for col in ['Old', 'New']:
+            scores[col + ' Rank'] = scores[col + ' Score'].round(9).rank(
+                ascending=False, method='min')
+        changed = ~np.isclose(scores['Old Score'], scores['New Score'],
+            rtol=0, atol=1e-9) | (scores['Old Rank'] != scores['New Rank'])
+
+        return scores[changed]
+
+    def _transform_rows(self, rows):
+        """
+        Runs the steps of the ETL process that only depend on each row over
+        the given rows
+
+        :param rows: DataFrame of schools in the 2016 School Explorer format
+        :return: A SchoolData subset with the transformed rows
+        """
+        new = SchoolData(rows.copy(), self.figwidth, self.figheight,
+            subset=True, cache=self.cache)
+        # Zip code counts are looked up from the schools already in the data,
+        # the files are only read again for zip codes that are new
+        if new.df['Zip'].isin(self.df['Zip']).all():
+            zips = self.df.drop_duplicates('Zip').set_index('Zip')
+            for col in ['Grocery Store Count', 'Car Crash Count']:
+                new.df[col] = new.df['Zip'].map(zips[col])
+            del zips
+        else:
+            new.run_stage('retail_read')
+            new.car_read()
+        new.metro_read()
+        new._transform_row_local(self._grade_bits)
+
+        return new
+
+    def _transform_row_local(self, grade_bits):
+        """
+        Runs the steps of _transform_data() that only depend on each row. Bins,
+        imputation and everything after them depend on the rest of the data
+
+        :param grade_bits: Dictionary of grade: bit in 'Grades Mask', shared
+            so the masks of every part of the data line up
+        """
+        self._rename_cols()
+        self._type_correction()
+        self._row_features(set())
+        self._grade_combination()
+        self._grade_bits = grade_bits
+        self._grade_bools()
+
+        return
+
+    def _replace_rows(self, new_df):
+        """
+        Replaces the schools in self.df that share a Location Code with
+        new_df and adds the rest of new_df to the end
+
+        :param new_df: DataFrame of transformed rows from _transform_rows()
+        :return: Boolean Series of the rows in self.df that were replaced or
+            added
+        """
+        new_df = new_df.set_index('Location Code')
+        # Every school gets a column for every grade that is offered
+        # The new rows share self._grade_bits, so their masks line up
+        for grade, bit in self._grade_bits.items():
+            if grade not in self.df.columns and grade not in new_df.columns:
+                continue
+            if grade not in self.df.columns:
+                self.df[grade] = False
+            if grade not in new_df.columns:
+                new_df[grade] = (new_df['Grades Mask'].values & (1 << bit)) \
+                    != 0
+        cols = [col for col in self.df.columns if col in new_df.columns]
+
+        codes = self.df['Location Code']
+        replaced = codes.isin(new_df.index)
+        for col in cols:
+            # Categorical columns need any new values added as categories
+            if isinstance(self.df[col].dtype, pd.CategoricalDtype):
+                self.df[col] = self.df[col].cat.add_categories(
+                    pd.Index(new_df[col].dropna().unique()).difference(
+                        self.df[col].cat.categories))
+            self.df.loc[replaced, col] = \
+                new_df.loc[codes[replaced], col].values
+
+        added = new_df[~new_df.index.isin(codes)].reset_index()
+        if len(added) > 0:
+            self.df = pd.concat([self.df, added[['Location Code'] + cols]],
+                ignore_index=True)
+        touched = self.df['Location Code'].isin(new_df.index)
+
+        # The new rows are not imputed yet, bins are marked by
+        # _update_row_features() when they are cut
+        self._missing = self._missing.reindex(self.df.index, fill_value=False)
+        for col in self._missing.columns.intersection(cols):
+            self._missing.loc[touched, col] = self.df.loc[touched, col].isna()
+
+        return touched
+
+    def _update_row_features(self, rows, cut_bounds):
+        """
+        Cuts bins for and imputes the data after the given rows changed, which
+        depend on the rest of the data. Bins are cut from the values before
+        imputation and every imputed cell is filled again with the new median
+        or mode, the same as the ETL process
+
+        :param rows: Boolean Series of the rows that changed
+        :param cut_bounds: Dictionary of the (minimum, maximum) of each column
+            in self._bin_dict before imputation and before the rows changed
+        :return: Boolean Series of the other rows whose bins or imputed
+            values changed
+        """
+        cols = list(dict.fromkeys([item['new_col'] for item in
+            self._bin_dict.values()] + list(self._missing.columns)))
+        before = self.df[cols].astype(object)
+
+        for item in self._bin_dict.values():
+            raw = self._unimputed(item['cut_col'])
+            bounds = (raw.min(), raw.max())
+            # The same edges pd.cut() creates from the whole column
+            edges = pd.cut(pd.Series(bounds), item['bin_size'],
+                retbins=True)[1]
+            if bounds == cut_bounds[item['cut_col']]:
+                bins = pd.cut(raw[rows], edges, labels=item['labels'])
+                self.df.loc[rows, item['new_col']] = bins
+            else:
+                bins = pd.cut(raw, edges, labels=item['labels'])
+                self.df[item['new_col']] = bins
+            if item['new_col'] in self._missing:
+                self._missing.loc[bins.index, item['new_col']] = bins.isna()
+
+        for col in [item['col'] for item in self._impute_dict.values()]:
+            missing = self._missing[col]
+            self.df.loc[missing, col] = self.df.loc[~missing, col].median()
+        for col in self._cat_impute:
+            missing = self._missing[col]
+            self.df.loc[missing, col] = self.df.loc[~missing, col].mode(
+                ).iloc[0]
+
+        after = self.df[cols].astype(object)
+        changed = ~((before == after) | (before.isna() & after.isna())).all(
+            axis=1)
+
+        return changed & ~rows
+
+    def _record_missing(self):
+        """
+        Keeps which cells of the imputed columns are missing in
+        self._missing, so update() can impute them again from new medians
+        and modes. Called after bins are cut and before imputation
+        """
+        cols = [item['col'] for item in self._impute_dict.values()] + \
+            list(self._cat_impute)
+        self._missing = self.df[list(dict.fromkeys(cols))].isna()
+
+        return
+
+    def _unimputed(self, col):
+        """
+        Returns a column of self.df with the cells that were imputed missing
+        again
+        """
+        if col in self._missing:
+            return self.df[col].where(~self._missing[col])
+
+        return self.df[col]
+
+    def retail_read(self, retail_zips=None):
+        """
+        Reads in Grocery Store Data and merges with dataset
+
+        :param retail_zips: Output of _load_retail(), read here if None
+        """
+        if retail_zips is None:
+            retail_zips = self._load_retail()
+        self.df = pd.merge(self.df, retail_zips, on = 'Zip', how = 'left')
         del retail_zips
 
         # Convert to integer values and fill empty values with 0
@@ -52,98 +712,177 @@ class SchoolData(SchoolOrganize, SchoolGraph):
 
         return
 
-    def  metro_read(self):
+    def _load_retail(self, file='Retail_Food_Stores.csv'):
         """
-        Reads in Metro Distances data and merges with dataset
+        Counts the grocery stores in each zip code
+
+        :param file: The retail food store data to read
+        :return: DataFrame of 'Zip' and 'Grocery Store Count'
         """
-        # Computationally expensive, ran once and saved info
-        # self._metro_read()
-        # Reloads computed code and adds it to the dataframe
-        metro_distance = pd.read_csv('Metro distances.csv')
-        self.df['Closest Metro Station'] = metro_distance
+        retail_food_df = self.schema.read_csv(file, 'retail')
 
-        del metro_distance
+        retail_food_df['Establishment Type'] = \
+            retail_food_df['Establishment Type'].str.strip()
+        retail_zips = pd.DataFrame(retail_food_df[retail_food_df[\
+            'Establishment Type'] == \
+            'A'].groupby('Zip Code').count().loc[:,'County'])
+        retail_zips = retail_zips.reset_index()
+        retail_zips.columns = ['Zip', 'Grocery Store Count']
+        del retail_food_df
+
+        return retail_zips
+
+    def metro_read(self):
+        """
+        Computes the distance to the closest Metro Station and merges with
+        dataset
+        """
+        self.run_stage('_metro_read')
 
         return
 
-    def _metro_read(self):
-        # Read in file
-        metro_df = pd.read_csv('NYC_Transit_Subway_Entrance_And_Exit_Data.csv')
-
-        # Create a tuple of co-ordinates to match the metro_df
-        df['Coords'] = [(i,j) for i, j in zip(df['Latitude'], df['Longitude'])]
-
-        # Read from bottom to top for most coherent explanation of the double
-        # list comprehension
-                    # Creates a tuple out of the two float numbers in a
-                    # co-ordinate
-        stations = [tuple([float(number) for number in group]) \
-                    # Takes each string co-ordinate, and separates it into
-                    # two float numbers (in string form)
-                    for group in [s.strip("()").split(",") \
-                                  # For each co-ordinate stored in the metro
-                                  # dataframe
-                                  for s in metro_df['Station Location']] ]
-
-        def returnClosestStation(coords):
-            closest = -1
-            for station in stations:
-                distance = coordsDistance( station, coords)
-                if distance > closest:
-                    closest = distance
-            return closest
+    def _metro_read(self, stations=None):
+        """
+        Adds the distance from each school to its closest Metro Station
 
+        :param stations: Output of _load_stations(), read here if None
+        """
+        closest = self.closest_stations(k=1, stations=stations)
         self.df['Closest Metro Station'] = \
-            self.df['Coords'].apply(returnClosestStation)
+            closest['Metro Station 1 Distance'].values
+
+        del closest
+
+        return
+
+    def closest_stations(self, k=1,
+        file='NYC_Transit_Subway_Entrance_And_Exit_Data.csv', radius=3958.8,
+        stations=None):
+        """
+        Finds the k closest subway stations to every school through a ball
+        tree built on the great-circle (haversine) distance between
+        co-ordinates
+
+        :param k: The number of closest stations to return for each school
+        :param file: The subway entrance and exit data to read stations from
+        :param radius: Radius of the Earth, the default returns miles
+        :param stations: Output of _load_stations(), file is read if None
+        :return: DataFrame aligned with self.df with a 'Metro Station i' name
+            and 'Metro Station i Distance' column for the i-th closest station
+
+        >>> data.closest_stations(k=2).columns.tolist()
+        ['Metro Station 1', 'Metro Station 1 Distance',
+         'Metro Station 2', 'Metro Station 2 Distance']
+        """
+        if stations is None:
+            stations = self._load_stations(file)
+        names, tree = stations
+
+        coords = self.df[['Latitude', 'Longitude']].values
+        # Schools without co-ordinates are left as NaN
+        located = ~np.isnan(coords).any(axis=1)
+        distances = np.full((len(coords), k), np.nan)
+        indices = np.zeros((len(coords), k), dtype=int)
+        distances[located], indices[located] = tree.query(
+            np.radians(coords[located]), k=k)
+        distances *= radius
+
+        closest = pd.DataFrame(index=self.df.index)
+        for i in range(k):
+            closest['Metro Station ' + str(i + 1)] = \
+                np.where(located, names[indices[:, i]], None)
+            closest['Metro Station ' + str(i + 1) + ' Distance'] = \
+                distances[:, i]
+
+        return closest
+
+    def _load_stations(self,
+        file='NYC_Transit_Subway_Entrance_And_Exit_Data.csv'):
+        """
+        Reads the subway stations and builds a ball tree on the great-circle
+        (haversine) distance between their co-ordinates
+
+        :param file: The subway entrance and exit data to read stations from
+        :return: Array of station names, and the BallTree of their
+            co-ordinates in radians
+        """
+        from sklearn.neighbors import BallTree
+
+        metro_df = self.schema.read_csv(file, 'subway')
+        # Every entrance of a station shares the station's location
+        metro_df = metro_df.drop_duplicates(subset='Station Location')
+        metro_df = metro_df.reset_index(drop=True)
+
+        # '(40.660397, -73.998091)' -> [40.660397, -73.998091]
+        stations = metro_df['Station Location'].str.strip('()').str.split(',',
+            expand=True).astype(float).values
+        tree = BallTree(np.radians(stations), metric='haversine')
+        names = metro_df['Station Name'].values
 
         del metro_df
         del stations
 
-        self.df['Closest Metro Station'].to_csv(\
-            'Metro distances.csv', index = False)
+        return names, tree
 
     def car_read(self):
         """
         Reads in the car-accident data and merges with the dataset
         """
-        # Computationally expensive, ran once and saved info
-        # self._car_read()
-        # Reloads computed code and adds it to the dataframe
-        car_crashes = pd.read_csv('Car Crash Count.csv')
-        self.df['Car Crash Count'] = car_crashes
-        del car_crashes
-
-    def _car_read(self):
-        crashes_df = pd.read_csv('nypd-motor-vehicle-collisions.csv')
-        # Many zip code values weren't kept track of, most of these were considered less severe car accidents so I dropped
-        # them all from the dataset
-        crashes_df = pd.DataFrame(crashes_df.dropna(subset = \
-            ['ZIP CODE']).groupby('ZIP CODE').count()['TIME'])
-        crashes_df = crashes_df.reset_index()
-        crashes_df.columns = ['Zip', 'Car Crash Count']
-
-        # Zip codes were not inputted well in this dataset, there were multiple formats for all zip codes, I went through a process
-        # of converting from strings to floats or ints or just returned as an empty string to drop later.
-
-        def convert(n):
-            try:
-                return(int(n))
-            except:
-                pass
-            try:
-                return(float(n))
-            except:
-                pass
-            return(n.strip())
-
-        crashes_df['Zip'] = crashes_df['Zip'].apply(convert)
-        crashes_df = crashes_df[crashes_df['Zip'] != ''].astype(int)
-        crashes_df = crashes_df.groupby('Zip').sum()
-        self.df = pd.merge(self.df, crashes_df, on = 'Zip', how = 'left')
-
-        del crashes_df
-
-        self.df['Car Crash Count'].to_csv('Car Crash Count.csv', index = False)
+        self.run_stage('_car_read')
+
+        return
+
+    def _car_read(self, crash_counts=None):
+        """
+        Maps the number of car accidents in each school's zip code
+
+        :param crash_counts: Output of _load_crashes(), read here if None
+        """
+        if crash_counts is None:
+            crash_counts = self._load_crashes()
+        self.df['Car Crash Count'] = \
+            self.df['Zip'].map(crash_counts.astype(int))
+
+        del crash_counts
+
+        return
+
+    def _load_crashes(self, file='nypd-motor-vehicle-collisions.csv',
+        chunksize=500000, silence=True):
+        """
+        Streams the car-accident data in chunks, only reading the columns that
+        are needed, and counts the accidents per zip code
+
+        :param file: The NYPD motor vehicle collisions data to read
+        :param chunksize: The number of rows held in memory at once
+        :param silence: Whether or not to print the rows read per second
+        :return: Series of the number of accidents in each zip code
+        """
+        start = time.perf_counter()
+        rows = 0
+        crash_counts = pd.Series(dtype=int)
+        chunks = self.schema.read_csv(file, 'collisions',
+            chunksize=chunksize)
+        for chunk in chunks:
+            rows += len(chunk)
+            # Zip codes were not inputted well in this dataset, there are
+            # multiple formats for all zip codes ('10001', '10001.0', blank)
+            zips = pd.to_numeric(chunk['ZIP CODE'].str.strip(),
+                errors='coerce')
+            # Many zip code values weren't kept track of, most of these were
+            # considered less severe car accidents so they are dropped
+            chunk = chunk[zips.notna()]
+            counts = chunk['TIME'].groupby(zips[zips.notna()].astype(int)
+                ).count()
+            crash_counts = crash_counts.add(counts, fill_value=0)
+        del chunks
+
+        seconds = time.perf_counter() - start
+        if silence is False:
+            print('Car crashes: %d rows in %.2f seconds (%d rows/sec)' %
+                (rows, seconds, rows / seconds))
+
+        return crash_counts
 
     def _transform_data(self):
         """
@@ -154,11 +893,7 @@ class SchoolData(SchoolOrganize, SchoolGraph):
         self._type_correction()
         # Set to retain only unique items, filled with some base columns
         # I won't be using
-        drop_cols = set(['Adjusted Grade', 'New?',
-                         'Other Location Code in LCGMS',
-                         'SED Code', 'Location Code',
-                         'Address (Full)'])
-        drop_cols = self._feature_engineering(drop_cols)
+        drop_cols = self._feature_engineering(set(self._unused_cols))
         # Make sure not to drop columns concerning all students
         drop_cols = [i for i in drop_cols if 'All Students' not in i]
         # Drop superfluous columns
@@ -166,6 +901,7 @@ class SchoolData(SchoolOrganize, SchoolGraph):
 
         # Organize grades
         self._grade_combination()
+        self._record_missing()
         # Impute numerical columns
         self.dict_fun_run(self._impute_dict, self.imputer)
         # Impute categorical columns
@@ -173,8 +909,127 @@ class SchoolData(SchoolOrganize, SchoolGraph):
             self.cat_impute(col)
         # Create Boolean columns for different grades
         self._grade_bools()
-        del self._impute_dict
-        del self._cat_impute
+        return
+
+    def _partial_stats(self):
+        """
+        Collects what the steps of the ETL process that depend on the rest of
+        the data need from self.df: the bounds of the columns cut into bins
+        and counts of the values medians and modes are taken from. Partial
+        statistics of parts of the data merge with _merge_partial_stats()
+
+        :return: Dictionary of 'bounds', 'counts' and 'dtypes'
+        """
+        bins = {item['new_col']: item['cut_col']
+                for item in self._bin_dict.values()}
+        counted = [item['col'] for item in self._impute_dict.values()] + \
+            [bins.get(col, col) for col in self._cat_impute]
+        stats = {'bounds': {}, 'counts': {}, 'dtypes': {}}
+        for col in bins.values():
+            stats['bounds'][col] = (self.df[col].min(), self.df[col].max())
+        for col in dict.fromkeys(counted):
+            stats['counts'][col] = self.df[col].value_counts()
+            stats['dtypes'][col] = self.df[col].dtype
+
+        return stats
+
+    @staticmethod
+    def _merge_partial_stats(total, stats):
+        """
+        Merges partial statistics into the total so far, in any order
+
+        :param total: Merged statistics, or None for the first part
+        :param stats: Statistics from _partial_stats()
+        :return: The merged statistics
+        """
+        if total is None:
+            return stats
+
+        for col, (low, high) in stats['bounds'].items():
+            total['bounds'][col] = (np.fmin(total['bounds'][col][0], low),
+                                    np.fmax(total['bounds'][col][1], high))
+        for col, counts in stats['counts'].items():
+            total['counts'][col] = total['counts'][col].add(counts,
+                fill_value=0)
+
+        return total
+
+    def _global_stats(self, total):
+        """
+        Returns the bin edges, medians and modes of the whole data from its
+        merged partial statistics, the same as computing them from every row
+
+        :param total: Statistics merged with _merge_partial_stats()
+        :return: Dictionary of 'edges', 'medians' and 'modes'
+        """
+        stats = {}
+        stats['medians'] = {item['col']: self._counts_median(total['counts'][
+            item['col']]) for item in self._impute_dict.values()}
+        # The same edges pd.cut() creates from the whole column
+        stats['edges'] = {item['new_col']: pd.cut(pd.Series(total['bounds'][
+            item['cut_col']]), item['bin_size'], retbins=True)[1]
+            for item in self._bin_dict.values()}
+
+        # Ties go to the first value, the same as Series.mode().iloc[0]
+        bins = {item['new_col']: item for item in self._bin_dict.values()}
+        stats['modes'] = {}
+        for col in self._cat_impute:
+            if col in bins:
+                # Bins are cut before imputation, from the counted values
+                counts = total['counts'][bins[col]['cut_col']]
+                labels = pd.cut(counts.index, stats['edges'][col],
+                    labels=bins[col]['labels'])
+                counts = counts.groupby(labels, observed=False).sum()
+            else:
+                counts = total['counts'][col]
+                if not isinstance(total['dtypes'][col], pd.CategoricalDtype):
+                    counts = counts.sort_index()
+            stats['modes'][col] = counts.idxmax()
+
+        return stats
+
+    @staticmethod
+    def _counts_median(counts):
+        """
+        Returns the median of the values counted in counts, the same as
+        np.median() of every value
+        """
+        counts = counts[counts > 0].sort_index()
+        cumulative = counts.values.cumsum()
+        total = cumulative[-1]
+        lower = counts.index[np.searchsorted(cumulative, (total - 1) // 2,
+            side='right')]
+        upper = counts.index[np.searchsorted(cumulative, total // 2,
+            side='right')]
+
+        return (lower + upper) / 2
+
+    def _cut_bins(self, edges):
+        """
+        Cuts the bins of self._bin_dict with edges from _global_stats()
+        """
+        for item in self._bin_dict.values():
+            self.df[item['new_col']] = pd.cut(self.df[item['cut_col']],
+                edges[item['new_col']], labels=item['labels'])
+        self._bump_version()
+
+        return
+
+    def _impute_global(self, medians, modes):
+        """
+        Imputes the columns of self._impute_dict and self._cat_impute with
+        medians and modes from _global_stats()
+        """
+        for item in self._impute_dict.values():
+            col = self.df[item['col']]
+            # Imputed columns come back as floats, keeping their precision
+            dtype = col.dtype if pd.api.types.is_float_dtype(col) else float
+            self.df[item['col']] = col.fillna(medians[item['col']]).astype(
+                dtype)
+        for col in self._cat_impute:
+            self.df[col] = self.df[col].fillna(modes[col])
+        self._bump_version()
+
         return
 
     def _rename_cols(self):
@@ -185,23 +1040,24 @@ class SchoolData(SchoolOrganize, SchoolGraph):
         self.df.rename(columns={
             'Grade 3 Math - All Students tested':
             'Grade 3 Math - All Students Tested'}, inplace=True)
+        # Headers changed, so the column catalog is parsed again
+        self._catalog = None
         return
 
     def _type_correction(self):
         """
-        A function for all type corrections
+        A function for all type corrections, the cells that could not be
+        converted are kept in self.parse_errors
         """
-        # Convert from dollars to a float
-        self.df['School Income Estimate'] = \
-            self.df['School Income Estimate'].apply(self.dollarsToDigits)
+        self.parse_errors = self.parse_columns(self._type_dict)
 
-        # Converts all object style percents to float style percents
-        for col in self._perc_cols:
-            self.df[col] = self.df[col].apply(self.percents_to_floats)
+        return
 
-        # Convert column to type Boolean
-        self.df['Community School?'] = self.df['Community School?'].map(
-            {'Yes': 1, 'No': 0})
+    def _correct_type(self, col):
+        """
+        Type corrects a single column from self._type_dict
+        """
+        self.parse_columns({col: self._type_dict[col]})
 
         return
 
@@ -211,204 +1067,301 @@ class SchoolData(SchoolOrganize, SchoolGraph):
 
         :return: Nothing, all columns are assigned in the function
         """
-        cols = list(self.df.columns)
+        catalog = self.column_catalog()
+        sum_dict = {}
         for grade in range(3, 8 + 1):
-            col_data = [i for i in cols if ('Grade ' + str(grade) in i) and
-                        ('All Students' in i) and
-                        ('Tested' not in i)]
-            self.df['Grade ' + str(grade) + ' 4s Total'] = \
-                self.df[col_data].apply(sum, axis=1)
-            col_data = [i for i in cols if ('Grade ' + str(grade) in i) and
-                        ('All Students' in i) and
-                        ('Tested' in i)]
-            self.df['Grade ' + str(grade) + ' 4s Tested Total'] = \
-                self.df[col_data].apply(sum, axis=1)
-        del cols
+            sum_dict['Grade ' + str(grade) + ' 4s Total'] = catalog.select(
+                grades=grade, groups='All Students', tested=False)
+            sum_dict['Grade ' + str(grade) + ' 4s Tested Total'] = \
+                catalog.select(grades=grade, groups='All Students',
+                               tested=True)
+        self.column_sums(sum_dict)
         return
 
     def _grade_bools(self):
         """
-        Create a boolean column for each possible grade
+        Encodes the grades each school offers as a bitmask in 'Grades Mask'
+        and creates a boolean column for each possible grade from it
         """
-        grades = self.lol_to_set(col='Grades', splitby=',')
+        # Each distinct Grades value is split once, then spread to every
+        # school by its code
+        codes, uniques = pd.factorize(self.df['Grades'])
+        tokens = [str(grades).split(',') for grades in uniques]
+        for grade in dict.fromkeys(j for sub in tokens for j in sub):
+            self._grade_bits.setdefault(grade, len(self._grade_bits))
+        # The trailing 0 is the mask of schools with no Grades
+        masks = np.array([sum(1 << self._grade_bits[grade] for grade in
+                          set(sub)) for sub in tokens] + [0], dtype=np.int32)
+        self.df['Grades Mask'] = masks[codes]
+
+        for grade in dict.fromkeys(j for sub in tokens for j in sub):
+            self.df[grade] = self.offers_grades(grade).values
+        return
 
-        for grade in grades:
-            self.df[grade] = False
+    def grade_mask(self, grades):
+        """
+        Returns the bitmask of the given grades, grades that no school offers
+        are ignored
 
-        for grade in grades:
-            self.df.loc[self.df['Grades'].str.contains(grade), grade] = True
-        return
+        :param grades: A grade or list of grades, such as ['SE', '06']
+        :return: Integer with the bit of each grade set
+        """
+        if isinstance(grades, str):
+            grades = [grades]
+
+        # Each grade counted once, a repeated bit would carry into the next
+        return sum(1 << self._grade_bits[grade] for grade in set(grades)
+                   if grade in self._grade_bits)
+
+    def offers_grades(self, grades, rows=None):
+        """
+        Returns whether each school offers any of the given grades
+
+        :param grades: A grade or list of grades, such as ['SE', '06']
+        :param rows: Index labels of the rows to check, all rows if None
+        :return: Boolean Series named after the grades
+
+        >>> data.offers_grades(['0K', 'K']).sum()
+        """
+        mask = self.df['Grades Mask'] if rows is None else \
+            self.df.loc[rows, 'Grades Mask']
+        name = grades if isinstance(grades, str) else ','.join(grades)
+
+        return pd.Series((mask.values & self.grade_mask(grades)) != 0,
+                         index=mask.index, name=name)
 
     def _calculate_in_need(self):
         """
         Calculates the In Need Score for schools, a weighted formula to
         determine what schools are in need of the new resources
         """
-        # Instantiate score column with 0, for lowest possible score
-        self.df['In Need Score'] = 0
-        # A nested dictionary to calculate weights and add to the In Need Score
-        pre_dict = {
-            0: {'pre_col':'Economic Need Index', 'weight':0.75},
-            1: {'pre_col':'White Students %', 'invert':True, 'weight':0.80},
-            2: {'pre_col':'Asian / Pacific Islanders Students %',
-                'weight':0.40},
-            3: {'pre_col':'Multiracial Students %', 'weight':0.05},
-            4: {'pre_col':'Black Students %', 'weight':0.80},
-            5: {'pre_col':'Hispanic / Latino Students %', 'weight':0.60},
-            6: {'pre_col':'American Indian / Alaska Native Students %',
-                'weight':0.15},
-            7: {'pre_col':'Limited English Students %', 'weight':0.05},
-            8: {'pre_col':'Economically Disadvantaged Students %',
-                'weight':0.30},
-            9: {'pre_col':'Total 4 %', 'invert':True, 'weight':0.8},
-            10: {'pre_col':'Math Prop 4', 'invert':True, 'weight':0.6},
-            11: {'pre_col':'ELA Prop 4', 'invert':True, 'weight':0.6},
-            12: {'pre_col':'Percent of Students Chronically Absent',
-                'weight':0.25},
-            13: {'pre_col':'Nonreported Ethnicity %',
-                'weight':0.15},
-            14: {'pre_col':'Students Tested Total', 'invert':True,
-                'weight':0.15}
-        }
-        # Computes all straight-forward weighted scores
-        self.dict_fun_run(pre_dict, self._in_need_calculate)
-
-        # School Income Estimate fits outside of the nice loop structure
-        # This is beacuse 0 indicates that they had no data for it, meaning it
-        # has to be handled differently than all other columns
-        self.subset_normalized_in_need(col='School Income Estimate',
-            weight=0.30, col_greater_than=0.001, filter_greater_than=0.001,
-            invert=True)
-        # Bin columns from groupby calls
-        bin_dict={
-            0:{'bin_col':'Total 4 % City Bin', 'lowest':0.30, 'low':0.20,
-                'medium':-0.40, 'high':-0.8},
-            1:{'bin_col':'School Income City Bin', 'lowest':0.20, 'low':0.10,
-                'medium':-0.40, 'high':-0.8},
-            2:{'bin_col':'ENI City Bin', 'lowest':0.20, 'low':0.10,
-                'medium':-0.40, 'high':-0.8},
-            3:{'bin_col':'School Income District Bin', 'lowest':0.20,
-                'low':0.10, 'medium':-0.40, 'high':-0.8},
-            4:{'bin_col':'Total 4 % District Bin', 'lowest':0.30, 'low':0.15,
-                'medium':-0.40, 'high':-0.8}
-        }
-
-        # Instantiate Classes in order to get their information
-        self._init_cit()
-        self._init_dis()
-
-        self.dict_fun_run(bin_dict, self.iterate_bin_need)
-        # Rating information and how it affects score
-        rating_dict={
-            0:{'bin_col':'Rigorous Instruction Rating',
-                'not_meeting_target':0.75, 'approaching_target':0.55,
-                'meeting_target':-0.75, 'exceeding_target':-1},
-            1:{'bin_col':'Collaborative Teachers Rating',
-                'not_meeting_target':0.75, 'approaching_target':0.55,
-                'meeting_target':-0.75, 'exceeding_target':-1},
-            2:{'bin_col':'Supportive Environment Rating',
-                'not_meeting_target':0.75, 'approaching_target':0.55,
-                'meeting_target':-0.75, 'exceeding_target':-1},
-            3:{'bin_col':'Effective School Leadership Rating',
-                'not_meeting_target':0.5, 'approaching_target':0.25,
-                'meeting_target':-0.25, 'exceeding_target':-0.5},
-            4:{'bin_col':'Strong Family-Community Ties Rating',
-                'not_meeting_target':0.25, 'approaching_target':0.10,
-                'meeting_target':-0.10, 'exceeding_target':-0.25},
-            5:{'bin_col':'Trust Rating',
-                'not_meeting_target':0.25, 'approaching_target':0.10,
-                'meeting_target':-0.10, 'exceeding_target':-0.25},
-            6:{'bin_col':'Student Achievement Rating',
-                'not_meeting_target':0.75, 'approaching_target':0.55,
-                'meeting_target':-0.75, 'exceeding_target':-1}
-        }
-
-        self.dict_fun_run(rating_dict, self.iterate_bin_rating)
-
-        # If the school offers a grade associated with SE or 6+
-        grades_in_need = (self.df['SE'] == True) | (self.df['06'] == True) |\
-            (self.df['07'] == True) | (self.df['08'] == True) | \
-            (self.df['09'] == True) | (self.df['10'] == True) | \
-            (self.df['11'] == True) | (self.df['12'] == True)
-        # Increase the In Need Score
-        self.df.loc[grades_in_need, 'In Need Score'] += 0.5
-
+        self._in_need_bounds = self.in_need_bounds()
+        self._raw_in_need = pd.Series(self.raw_in_need(self.df.index),
+            index=self.df.index)
         # Normalize the In Need Score column from 0 to 100
-        self.df['In Need Score'] = self.normalize_column('In Need Score') * 100
+        self._normalize_in_need()
 
         return
 
-    def iterate_bin_need(self, bin_col, lowest, low, medium, high):
+    def in_need_bounds(self):
         """
-        Iterates through each row and and adds points to In Need Score. This is
-        inefficient but it works
+        Returns the minimum and maximum of every column that is normalized for
+        the In Need Score. These are the only values a school's score depends
+        on from the rest of the data, besides the District and City bins
+
+        :return: Dictionary of column: (minimum, maximum)
         """
-        for index, value in enumerate(self.df[bin_col]):
-            self._bin_need_calculate(value, index, lowest, low, medium, high)
+        bounds = {}
+        for item in self._in_need_dict.values():
+            bounds[item['pre_col']] = (self.df[item['pre_col']].min(),
+                self.df[item['pre_col']].max())
+
+        # Only values above greater_than are normalized, 0 means no data
+        col = self._income_need_dict['col']
+        reported = self.df[col][(self.df[col] >=
+            self._income_need_dict['greater_than']) &
+            (self.df[col] <= self.df[col].max())]
+        bounds[col] = (reported.min(), reported.max())
+
+        return bounds
 
-    def iterate_bin_rating(self, bin_col, not_meeting_target,
-        approaching_target, meeting_target, exceeding_target):
+    def raw_in_need(self, rows):
         """
-        Iterates through each row and and adds points to In Need Score. This is
-        inefficient but it works
+        Computes the In Need Score of the given rows before it is normalized
+        from 0 to 100, as their components times the weight of each
+
+        :param rows: Index labels of the rows in self.df to score
+        :return: Array of the scores
         """
-        for index, value in enumerate(self.df[bin_col]):
-            self._bin_rating_calculate(value, index, not_meeting_target,
-                approaching_target, meeting_target, exceeding_target)
+        return self.in_need_components(rows).to_numpy() @ \
+            self.in_need_weights().to_numpy()
 
-    def _bin_rating_calculate(self, value, index, not_meeting_target,
-        approaching_target, meeting_target, exceeding_target):
+    def in_need_components(self, rows=None):
         """
-        Compares the inputted value and adds points to In Need Score based on
-        the variables
+        Splits the In Need Score into the parts that are weighted, normalizing
+        columns with self._in_need_bounds. Every bin and rating column gives
+        one 0 / 1 component per level, so any weighting of the score is the
+        components times a vector of weights
+
+        :param rows: Index labels of the rows in self.df, all if None
+        :return: DataFrame of schools by components, in the order of
+            in_need_weights()
         """
-        if value=='Not Meeting Target':
-            self.df.loc[index, 'In Need Score'] += not_meeting_target
-        elif value=='Approaching Target':
-            self.df.loc[index, 'In Need Score'] += approaching_target
-        elif value=='Meeting Target':
-            self.df.loc[index, 'In Need Score'] += meeting_target
-        elif value=='Exceeding Target':
-            self.df.loc[index, 'In Need Score'] += exceeding_target
-        return
+        df = self.df if rows is None else self.df.loc[rows]
+        components = {}
+        # Straight-forward weighted columns, normalized from 0 to 1
+        for item in self._in_need_dict.values():
+            col_min, col_max = self._in_need_bounds[item['pre_col']]
+            normalized = (df[item['pre_col']].values - col_min) / \
+                (col_max - col_min)
+            if item.get('invert', False):
+                normalized = 1 - normalized
+            components[item['pre_col']] = normalized
 
-    def _bin_need_calculate(self, value, index, lowest, low, medium, high):
-        """
-        Compares the inputted value and adds points to In Need Score based on
-        the variables
+        # School Income Estimate fits outside of the nice loop structure
+        # This is beacuse 0 indicates that they had no data for it, meaning it
+        # has to be handled differently than all other columns
+        col = self._income_need_dict['col']
+        col_min, col_max = self._in_need_bounds[col]
+        income = df[col].values
+        reported = (income >= self._income_need_dict['greater_than']) & \
+            (income <= col_max)
+        components[col] = np.zeros(len(df))
+        components[col][reported] = 1 - (income[reported] - col_min) / \
+            (col_max - col_min)
+
+        # Bin columns from groupby calls, then the rating information. Values
+        # missing or not in levels are in no component
+        for score_dict, levels in [(self._bin_need_dict, self._bin_levels),
+            (self._rating_need_dict, self._rating_levels)]:
+            for item in score_dict.values():
+                codes = pd.Categorical(df[item['bin_col']],
+                    categories=list(levels)).codes
+                for code, level in enumerate(levels):
+                    components['%s: %s' % (item['bin_col'], level)] = \
+                        (codes == code).astype(float)
+
+        # If the school offers a grade associated with SE or 6+
+        components['Grades In Need'] = ((df['Grades Mask'].values &
+            self.grade_mask(self._grades_need_dict['grades'])) != 0
+            ).astype(float)
+
+        return pd.DataFrame(components, index=df.index)
+
+    def in_need_weights(self):
         """
-        if value=='lowest':
-            self.df.loc[index, 'In Need Score'] += lowest
-        elif value=='low':
-            self.df.loc[index, 'In Need Score'] += low
-        elif value=='medium':
-            self.df.loc[index, 'In Need Score'] += medium
-        elif value=='high':
-            self.df.loc[index, 'In Need Score'] += high
-        return
+        Returns the weight of every component of in_need_components(), taken
+        from the In Need dictionaries
 
-    def _in_need_calculate(self, pre_col, weight, invert=False):
-        normalized_values = self.normalize_column(pre_col, invert)
-        self.df['In Need Score'] += normalized_values * weight
-        return
+        :return: Series of component: weight
+        """
+        weights = {}
+        for item in self._in_need_dict.values():
+            weights[item['pre_col']] = item['weight']
+        weights[self._income_need_dict['col']] = \
+            self._income_need_dict['weight']
+        for score_dict, levels in [(self._bin_need_dict, self._bin_levels),
+            (self._rating_need_dict, self._rating_levels)]:
+            for item in score_dict.values():
+                for level, key in levels.items():
+                    weights['%s: %s' % (item['bin_col'], level)] = item[key]
+        weights['Grades In Need'] = self._grades_need_dict['weight']
+
+        return pd.Series(weights, dtype=float)
+
+    def _normalize_in_need(self, rows=None):
+        """
+        Normalizes self._raw_in_need from 0 to 100 into the In Need Score
+        column. Every row is normalized if the minimum or maximum raw score
+        moved since the last call
 
-    def subset_normalized_in_need(self, col, weight, col_greater_than=None,
-        col_less_than=None, filter_greater_than=None,
-        filter_less_than=None, invert=False):
+        :param rows: Index labels of the rows to normalize, all if None
+        """
+        raw_range = (self._raw_in_need.min(), self._raw_in_need.max())
+        if rows is None or raw_range != self._in_need_range:
+            rows = self.df.index
+        self._in_need_range = raw_range
 
-        col_greater_than, col_less_than = self._set_greater_less_than(col,
-            col_greater_than, col_less_than)
+        self.df.loc[rows, 'In Need Score'] = ((self._raw_in_need[rows] -
+            raw_range[0]) / (raw_range[1] - raw_range[0])).values * 100
+        self._index_in_need()
 
-        subset_normalized = self.normalize_column_filter(col=col,
-            greater_than=filter_greater_than, less_than=filter_less_than,
-            invert=True)
+        return
 
-        self.df.loc[(self.df[col] >= col_greater_than) & \
-            (self.df[col] <= col_less_than),'In Need Score'] += \
-            subset_normalized * weight
+    def _index_in_need(self):
+        """
+        Sorts the schools by In Need Score once for top_in_need(), and splits
+        the sorted positions by District and by City. Each part keeps the
+        order of the scores, so it never has to be sorted again
+        """
+        # Positions in self.df, highest score first. Ties keep the order of
+        # the DataFrame
+        order = np.argsort(-self.df['In Need Score'].to_numpy(), kind='stable')
+        partitions = {}
+        for col in ['District', 'City']:
+            codes, uniques = pd.factorize(self.df[col].to_numpy()[order])
+            # A stable sort by group keeps each group in score order, schools
+            # missing the column (code -1) come first and are left out
+            grouped = order[np.argsort(codes, kind='stable')]
+            grouped = grouped[(codes < 0).sum():]
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            partitions[col] = dict(zip(uniques, np.split(grouped,
+                np.cumsum(counts)[:-1])))
+        self._need_index = (order, partitions)
 
         return
 
+    def top_in_need(self, k=5, district=None, city=None, grades=None,
+        min_tested=None):
+        """
+        Returns the k schools most in need, optionally only those matching
+        every filter given. Served from the index kept by _index_in_need(),
+        so a query only looks at the schools of the Districts or Cities asked
+        for, or at the top of the sorted schools when neither is given
+
+        :param k: The number of schools to return
+        :param district: A District or list of Districts
+        :param city: A City or list of Cities
+        :param grades: A grade or list of grades, schools offering any of
+            them are kept
+        :param min_tested: The fewest 'Students Tested Total' a school can have
+        :return: DataFrame of the schools, highest In Need Score first
+
+        >>> data.top_in_need(5, district=9, grades=['06', '07', '08'])
+        """
+        order, partitions = self._need_index
+        scores = self.df['In Need Score'].to_numpy()
+        filters = []
+        if grades is not None:
+            bits = self.grade_mask(grades)
+            masks = self.df['Grades Mask'].to_numpy()
+            filters.append(lambda pos: (masks[pos] & bits) != 0)
+        if min_tested is not None:
+            tested = self.df['Students Tested Total'].to_numpy()
+            filters.append(lambda pos: tested[pos] >= min_tested)
+
+        # Repeated values would take a partition more than once
+        groups = {col: list(pd.unique(np.atleast_1d(value))) for col, value
+            in [('District', district), ('City', city)] if value is not None}
+        if not groups:
+            # Walks the sorted schools in growing blocks until k pass
+            found, count, start, block = [], 0, 0, max(2 * k, 64)
+            while count < k and start < len(order):
+                chunk = order[start:start + block]
+                for fun in filters:
+                    chunk = chunk[fun(chunk)]
+                found.append(chunk)
+                count += len(chunk)
+                start += block
+                block *= 2
+            positions = np.concatenate(found)[:k] if found else order[:0]
+
+            return self.df.iloc[positions]
+
+        # Only the smaller of the District and City partitions is looked at,
+        # the other is checked like any other filter
+        parts = {col: [partitions[col].get(value, order[:0])
+                       for value in values] for col, values in groups.items()}
+        col = min(parts, key=lambda key: sum(map(len, parts[key])))
+        for other in set(groups) - {col}:
+            filters.append(lambda pos, values=self.df[other].to_numpy(),
+                keep=groups[other]: np.isin(values[pos], keep))
+        candidates = np.concatenate(parts[col])
+        for fun in filters:
+            candidates = candidates[fun(candidates)]
+
+        if len(parts[col]) > 1:
+            # Each partition is in score order but not with the others, so
+            # the top k are selected with a partial sort before sorting them.
+            # Every school tied with the kth is kept so ties stay in order
+            if len(candidates) > k:
+                kth = np.partition(-scores[candidates], k - 1)[k - 1]
+                candidates = candidates[-scores[candidates] <= kth]
+            candidates = candidates[np.lexsort((candidates,
+                -scores[candidates]))]
+
+        return self.df.iloc[candidates[:k]]
+
     def _misc_features(self):
         """
         A collection of operations to help readability and processing of data
@@ -418,16 +1371,8 @@ class SchoolData(SchoolOrganize, SchoolGraph):
         # Column needed for upcoming processing
         self.df['4 Tested Total'] = self.df['Math Tested 4s'] + \
             self.df['ELA Tested 4s']
-        column_4s = ['White Students Total',
-                     'Asian / Pacific Islanders Students Total',
-                     'Black Students Total',
-                     'Hispanic / Latino Students Total',
-                     'American Indian / Alaska Native Students Total',
-                     'Multiracial Students Total']
-
         # Operations that fit outside the dictionaries for organization reasons
-        self.df['Ethnicity Tested Total'] = \
-            self.df[column_4s].apply(sum, axis=1)
+        self.column_sums({'Ethnicity Tested Total': self._ethnicity_cols})
         self.df['Nonreported Ethnicity Total'] = \
             self.df['4 Tested Total'] - self.df['Ethnicity Tested Total']
         self.df['Nonreported Ethnicity %'] = \
@@ -440,6 +1385,20 @@ class SchoolData(SchoolOrganize, SchoolGraph):
         """
         Organizes, cleans, and feature engineers columns for the data
         """
+        drop_cols = self._row_features(drop_cols)
+        # Engineer all features that involve bins (pd.cut)
+        self.dict_fun_run(self._bin_dict, self._column_bin)
+
+        return drop_cols
+
+    def _row_features(self, drop_cols):
+        """
+        Engineers the features that only depend on each row, every feature
+        of _feature_engineering() but the bins
+
+        :param drop_cols: A set that will be updated with columns to drop
+        :return: A set of columns
+        """
         # Engineer all features that involve sums
         drop_cols = self._process_drop_features(self._sum_dict, drop_cols)
 
@@ -449,13 +1408,6 @@ class SchoolData(SchoolOrganize, SchoolGraph):
 
         # Engineer all features that involve division
         self.dict_fun_run(self._div_dict, self._column_div)
-        # Engineer all features that involve bins (pd.cut)
-        self.dict_fun_run(self._bin_dict, self._column_bin)
-
-        del self._sum_dict
-        del self._bin_dict
-        del self._div_dict
-        del self._perc_cols
 
         return drop_cols
 
@@ -470,20 +1422,24 @@ class SchoolData(SchoolOrganize, SchoolGraph):
         col_data = self.column_generator(subject=kwargs['subject'],
                                          students=kwargs['students'],
                                          test=kwargs['test'])
-        self.df[kwargs['new_col']] = self.df[col_data].apply(sum, axis=1)
+        self.column_sums({kwargs['new_col']: col_data})
         return(col_data)
 
     def _process_drop_features(self, dic, drop_cols):
         """
         Processes all features that will also be added to a list of columns to
-        drop from the dataset
+        drop from the dataset, summing every feature at once
 
         :param drop_cols: A set that will be updated with columns to drop
         :return: A set of columns
         """
-
-        for item in dic.items():
-            drop_cols.update(self._column_sum(**item[1]))
+        sum_dict = {}
+        for item in dic.values():
+            sum_dict[item['new_col']] = self.column_generator(
+                subject=item['subject'], students=item['students'],
+                test=item['test'])
+            drop_cols.update(sum_dict[item['new_col']])
+        self.column_sums(sum_dict)
 
         return drop_cols
 
@@ -518,28 +1474,19 @@ class SchoolData(SchoolOrganize, SchoolGraph):
         assert subject in ['both', 'Math', 'ELA'], ('Subject must be: both'
                                                     'Math, or ELA')
 
-        if test:
-            assert students == 'All Students', ('test Flag should only be set'
-                                                'true with All Students')
-            students += ' Tested'
-        else:
-            students = '4s - ' + students
-
-        # Stores a list of all the columns
-        cols = list(self.df.columns)
-
-        if subject == 'both':
-            lst = [i for i in cols if students in i and
-                    ('ELA' in i or 'Math' in i)]
-        elif subject == 'Math':
-            lst = [i for i in cols if students in i and 'Math' in i]
-        elif subject == 'ELA':
-            lst = [i for i in cols if students in i and 'ELA' in i]
-
+        subjects = ['ELA', 'Math'] if subject == 'both' else subject
         if grade != None:
             assert grade >= 3 and grade <= 8
-            lst = [i for i in lst if ('Grade ' + str(grade) in i)]
 
-        return lst
-        # else:
-        #     return -1  # An error has occurred
+        catalog = self.column_catalog()
+        if test:
+            assert students == 'All Students', ('test Flag should only be set'
+                                                'true with All Students')
+            return catalog.select(grades=grade, subjects=subjects,
+                                  groups=students, fours=False, tested=True)
+
+        # Groups are matched on their start, so 'Asian' finds
+        # 'Asian or Pacific Islander'
+        return catalog.select(grades=grade, subjects=subjects,
+                              groups=catalog.match_groups(students),
+                              fours=True, tested=False)
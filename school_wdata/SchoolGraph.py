@@ -11,9 +11,7 @@ class SchoolGraph(Graph):
         """
         Creates a bar graph based on the grades offered by the school
         """
-        try:
-            self.grade_data_list
-        except AttributeError:
+        if self._stale('grade_data_list'):
             self._init_grade_data_list()
         if title == None:
             title = plot_col + ' by Grade'
@@ -31,10 +29,12 @@ class SchoolGraph(Graph):
         """
         Creates a bar graph based on District and the plot column sent in
         """
-        try:
-            self.dis
-        except AttributeError:
+        if not hasattr(self, 'dis'):
             self._init_dis()
+        elif self._stale('dis'):
+            # Bins already merged to self.df are left as they are
+            self.dis = self._group_data('District', self._dis_bin_dict)
+            self._stamp_groups(['dis'])
 
         col = [self.dis.df[plot_col][i] for i in range(1,32+1)]
 
@@ -51,10 +51,10 @@ class SchoolGraph(Graph):
         """
         Creates a bar graph for all the different cities in the dataset
         """
-        try:
-            self.cit
-        except AttributeError:
+        if not hasattr(self, 'cit'):
             self._init_cit()
+        elif self._stale('cit'):
+            self._set_cit(self._group_data('City', self._cit_bin_dict).df)
 
         col = [self.cit.df[plot_col][city] for city in self.city_names]
         self.single_barplot(col=col, section_labels=self.city_names,
@@ -1,5 +1,7 @@
 from wdata import Data
+from .ColumnCatalog import ColumnCatalog
 import numpy as np
+import pandas as pd
 
 class SchoolOrganize(Data):
     """
@@ -94,13 +96,17 @@ class SchoolOrganize(Data):
                             'Supportive Environment %',
                             'Effective School Leadership %',
                             'Strong Family-Community Ties %', 'Trust %']
+        # The kind of string each column is converted from by parse_columns()
+        self._type_dict = {'School Income Estimate': 'currency',
+                           'Community School?': 'boolean'}
+        self._type_dict.update({col: 'percent' for col in self._perc_cols})
         # Collection of columns that require imputation for missing values
         self._impute_dict = {
-            1: {'col': 'Economic Need Index', 'miss_value': np.NaN,
+            1: {'col': 'Economic Need Index', 'miss_value': np.nan,
                 'strat': 'median'},
-            2: {'col': 'Average ELA Proficiency', 'miss_value': np.NaN,
+            2: {'col': 'Average ELA Proficiency', 'miss_value': np.nan,
                 'strat': 'median'},
-            3: {'col': 'Average Math Proficiency', 'miss_value': np.NaN,
+            3: {'col': 'Average Math Proficiency', 'miss_value': np.nan,
                 'strat': 'median'}
             }
         # Collection of categorical columns for imputation
@@ -111,43 +117,121 @@ class SchoolOrganize(Data):
                              'Strong Family-Community Ties Rating',
                              'Trust Rating', 'Student Achievement Rating',
                              'ENI Bin']
-
-    def _init_grade_data_list(self):
-        """
-        Instantiates a df_groupby() by grades dataframe for plotting
-        """
-        self.grade_data_list = [
-            self.df_groupby('SE'),
-            self.df_groupby('PK'),
-            self.df_groupby('K'),
-            self.df_groupby('01'),
-            self.df_groupby('02'),
-            self.df_groupby('03'),
-            self.df_groupby('04'),
-            self.df_groupby('05'),
-            self.df_groupby('06'),
-            self.df_groupby('07'),
-            self.df_groupby('08'),
-            self.df_groupby('09'),
-            self.df_groupby('10'),
-            self.df_groupby('11'),
-            self.df_groupby('12')
-        ]
-        return
-
-    def df_groupby(self, col, update_dict = None):
-        """
-        Group the data by the given column, and it will return an aggregated
-        copy of the dataframe stored within a Data class so the information can
-        be utilized with Data methods
-
-        :param col: The column to group the dataframe by
-        :param update_dict: If there are any columns not being aggregated, send
-        them as an argument here to be able to aggregate more information
-        """
-        agg_dict = {
+        # Ethnicity totals that make up the students with a reported ethnicity
+        self._ethnicity_cols = ['White Students Total',
+                                'Asian / Pacific Islanders Students Total',
+                                'Black Students Total',
+                                'Hispanic / Latino Students Total',
+                                'American Indian / Alaska Native Students Total',
+                                'Multiracial Students Total']
+        # Columns of the School Explorer that are dropped unused
+        self._unused_cols = ['Adjusted Grade', 'New?',
+                             'Other Location Code in LCGMS', 'SED Code',
+                             'Address (Full)']
+        # Weighted columns that are normalized and added to the In Need Score
+        self._in_need_dict = {
+            0: {'pre_col':'Economic Need Index', 'weight':0.75},
+            1: {'pre_col':'White Students %', 'invert':True, 'weight':0.80},
+            2: {'pre_col':'Asian / Pacific Islanders Students %',
+                'weight':0.40},
+            3: {'pre_col':'Multiracial Students %', 'weight':0.05},
+            4: {'pre_col':'Black Students %', 'weight':0.80},
+            5: {'pre_col':'Hispanic / Latino Students %', 'weight':0.60},
+            6: {'pre_col':'American Indian / Alaska Native Students %',
+                'weight':0.15},
+            7: {'pre_col':'Limited English Students %', 'weight':0.05},
+            8: {'pre_col':'Economically Disadvantaged Students %',
+                'weight':0.30},
+            9: {'pre_col':'Total 4 %', 'invert':True, 'weight':0.8},
+            10: {'pre_col':'Math Prop 4', 'invert':True, 'weight':0.6},
+            11: {'pre_col':'ELA Prop 4', 'invert':True, 'weight':0.6},
+            12: {'pre_col':'Percent of Students Chronically Absent',
+                'weight':0.25},
+            13: {'pre_col':'Nonreported Ethnicity %',
+                'weight':0.15},
+            14: {'pre_col':'Students Tested Total', 'invert':True,
+                'weight':0.15}
+        }
+        # School Income Estimate is only scored where it was reported, a value
+        # of 0 indicates that there was no data for it
+        self._income_need_dict = {'col': 'School Income Estimate',
+            'weight': 0.30, 'greater_than': 0.001}
+        # Points added if the school offers a grade associated with SE or 6+
+        self._grades_need_dict = {'grades': ['SE', '06', '07', '08', '09',
+            '10', '11', '12'], 'weight': 0.5}
+        # Grade: bit in 'Grades Mask'. Grades of the School Explorer have
+        # fixed bits, so masks loaded from a cache still line up, and any
+        # other grade is added after them as it is found
+        self._grade_bits = {grade: bit for bit, grade in enumerate(['SE',
+            'PK', '0K', 'K', '01', '02', '03', '04', '05', '06', '07', '08',
+            '09', '10', '11', '12'])}
+        # Bin columns from groupby calls and the points each bin adds
+        self._bin_need_dict = {
+            0:{'bin_col':'Total 4 % City Bin', 'lowest':0.30, 'low':0.20,
+                'medium':-0.40, 'high':-0.8},
+            1:{'bin_col':'School Income City Bin', 'lowest':0.20, 'low':0.10,
+                'medium':-0.40, 'high':-0.8},
+            2:{'bin_col':'ENI City Bin', 'lowest':0.20, 'low':0.10,
+                'medium':-0.40, 'high':-0.8},
+            3:{'bin_col':'School Income District Bin', 'lowest':0.20,
+                'low':0.10, 'medium':-0.40, 'high':-0.8},
+            4:{'bin_col':'Total 4 % District Bin', 'lowest':0.30, 'low':0.15,
+                'medium':-0.40, 'high':-0.8}
+        }
+        # Rating information and how it affects score
+        self._rating_need_dict = {
+            0:{'bin_col':'Rigorous Instruction Rating',
+                'not_meeting_target':0.75, 'approaching_target':0.55,
+                'meeting_target':-0.75, 'exceeding_target':-1},
+            1:{'bin_col':'Collaborative Teachers Rating',
+                'not_meeting_target':0.75, 'approaching_target':0.55,
+                'meeting_target':-0.75, 'exceeding_target':-1},
+            2:{'bin_col':'Supportive Environment Rating',
+                'not_meeting_target':0.75, 'approaching_target':0.55,
+                'meeting_target':-0.75, 'exceeding_target':-1},
+            3:{'bin_col':'Effective School Leadership Rating',
+                'not_meeting_target':0.5, 'approaching_target':0.25,
+                'meeting_target':-0.25, 'exceeding_target':-0.5},
+            4:{'bin_col':'Strong Family-Community Ties Rating',
+                'not_meeting_target':0.25, 'approaching_target':0.10,
+                'meeting_target':-0.10, 'exceeding_target':-0.25},
+            5:{'bin_col':'Trust Rating',
+                'not_meeting_target':0.25, 'approaching_target':0.10,
+                'meeting_target':-0.10, 'exceeding_target':-0.25},
+            6:{'bin_col':'Student Achievement Rating',
+                'not_meeting_target':0.75, 'approaching_target':0.55,
+                'meeting_target':-0.75, 'exceeding_target':-1}
+        }
+        # Values found in the bin and rating columns, mapped to the key that
+        # holds their weight in the dictionaries above
+        self._bin_levels = {'lowest': 'lowest', 'low': 'low',
+                            'medium': 'medium', 'high': 'high'}
+        self._rating_levels = {'Not Meeting Target': 'not_meeting_target',
+                               'Approaching Target': 'approaching_target',
+                               'Meeting Target': 'meeting_target',
+                               'Exceeding Target': 'exceeding_target'}
+        # Bins cut from the District and City df_groupby() aggregates, then
+        # merged to every school in that District or City
+        self._dis_bin_dict = {
+            1: {'new_col': 'Total 4 % District Bin', 'cut_col': 'Total 4 %',
+                'bin_size': 4, 'labels': ['lowest', 'low', 'medium', 'high']},
+            2: {'new_col': 'School Income District Bin',
+                'cut_col': 'School Income Estimate', 'bin_size': 4,
+                'labels': ['lowest', 'low', 'medium', 'high']}
+           }
+        self._cit_bin_dict = {
+            1: {'new_col': 'Total 4 % City Bin', 'cut_col': 'Total 4 %',
+                'bin_size': 4, 'labels': ['lowest', 'low', 'medium', 'high']},
+            2: {'new_col': 'School Income City Bin',
+                'cut_col': 'School Income Estimate', 'bin_size': 4,
+                'labels': ['lowest', 'low', 'medium', 'high']},
+            3: {'new_col': 'ENI City Bin', 'cut_col': 'Economic Need Index',
+                'bin_size': 4, 'labels': ['lowest', 'low', 'medium', 'high']}
+           }
+        # How each column is aggregated by df_groupby()
+        self._agg_dict = {
            'School Name':'count',
-           'City': self.com_fun,
+           'City': 'mode',
            'Economic Need Index': 'mean',
            'School Income Estimate': 'mean',
            'Percent ELL': 'mean',
@@ -158,18 +242,18 @@ class SchoolOrganize(Data):
            'Percent of Students Chronically Absent': 'mean',
            'Student Attendance Rate': 'mean',
            'Rigorous Instruction %': 'mean',
-           'Rigorous Instruction Rating': self.com_fun,
+           'Rigorous Instruction Rating': 'mode',
            'Collaborative Teachers %': 'mean',
-           'Collaborative Teachers Rating': self.com_fun,
+           'Collaborative Teachers Rating': 'mode',
            'Supportive Environment %': 'mean',
-           'Supportive Environment Rating': self.com_fun,
+           'Supportive Environment Rating': 'mode',
            'Effective School Leadership %': 'mean',
-           'Effective School Leadership Rating': self.com_fun,
+           'Effective School Leadership Rating': 'mode',
            'Strong Family-Community Ties %': 'mean',
-           'Strong Family-Community Ties Rating':self.com_fun,
+           'Strong Family-Community Ties Rating':'mode',
            'Trust %': 'mean',
-           'Trust Rating': self.com_fun,
-           'Student Achievement Rating': self.com_fun,
+           'Trust Rating': 'mode',
+           'Student Achievement Rating': 'mode',
            'Average ELA Proficiency': 'mean',
            'Average Math Proficiency': 'mean',
            'White Students Total': 'sum',
@@ -204,71 +288,309 @@ class SchoolOrganize(Data):
            'Limited English Students %': 'mean',
            'Economically Disadvantaged Students %': 'mean',
            'Nonreported Ethnicity %': 'mean',
-           'Income Bin': self.com_fun,
-           'ENI Bin': self.com_fun,
-           'Total % Bin': self.com_fun
+           'Income Bin': 'mode',
+           'ENI Bin': 'mode',
+           'Total % Bin': 'mode'
+        }
+        # Expensive ETL stages that can be stored in an ArtifactCache. Bump a
+        # stage's version whenever its code changes. Stages without input or
+        # output columns depend on, and replace, the whole DataFrame. 'attrs'
+        # are attributes the stage sets that are stored with its output
+        self._stage_dict = {
+            'retail_read': {'version': 1,
+                'files': ['Retail_Food_Stores.csv'],
+                'input_cols': ['Zip'],
+                'output_cols': ['Grocery Store Count']},
+            '_metro_read': {'version': 1,
+                'files': ['NYC_Transit_Subway_Entrance_And_Exit_Data.csv'],
+                'input_cols': ['Latitude', 'Longitude'],
+                'output_cols': ['Closest Metro Station']},
+            '_car_read': {'version': 1,
+                'files': ['nypd-motor-vehicle-collisions.csv'],
+                'input_cols': ['Zip'],
+                'output_cols': ['Car Crash Count']},
+            '_transform_data': {'version': 4, 'files': [],
+                'input_cols': None, 'output_cols': None,
+                'attrs': ['parse_errors', '_missing']}
         }
 
+        # Lazy feature graph, filled by _init_feature_graph()
+        self._feature_nodes = {}
+        self._feature_cols = {}
+        self._computed_nodes = set()
+        # Parsed grade, subject and group columns, built by column_catalog()
+        self._catalog = None
+        # Attribute: frame_version() its plotting aggregates were built from
+        self._group_versions = {}
+
+    def column_catalog(self):
+        """
+        Returns the ColumnCatalog of the grade, subject and group columns,
+        parsing the headers the first time it is called
+
+        :return: ColumnCatalog of self.df's columns
+        """
+        if self._catalog is None:
+            self._catalog = ColumnCatalog(self.df.columns)
+
+        return self._catalog
+
+    def drop_cols(self, col_list):
+        """
+        Drops columns in-place and removes them from the column catalog
+
+        :param col_list: A list of columns to drop
+        """
+        super().drop_cols(col_list)
+        if self._catalog is not None:
+            self._catalog.remove(col_list)
+
+        return
+
+    def _init_feature_graph(self):
+        """
+        Builds the graph of the columns created during the ETL process from
+        the dictionaries above, so feature() only computes what it is asked for
+
+        Each node stores the columns it depends on and the functions, with
+        their keyword arguments, that create its columns. self._feature_cols
+        maps each created column to its node, any other column is raw data
+        """
+        imputed = [item['col'] for item in self._impute_dict.values()]
+
+        for col in self._type_dict:
+            self._add_feature_node(col, [col], [],
+                [(self._correct_type, {'col': col})])
+
+        for stage, info in self._stage_dict.items():
+            if info['output_cols'] is not None:
+                self._add_feature_node(stage, info['output_cols'], [],
+                    [(self.run_stage, {'stage': stage})])
+
+        for item in self._sum_dict.values():
+            self._add_feature_node(item['new_col'], [item['new_col']],
+                self.column_generator(subject=item['subject'],
+                    students=item['students'], test=item['test']),
+                [(self._column_sum, item)])
+
+        self._add_feature_node('_misc_features', ['4 Tested Total',
+            'Ethnicity Tested Total', 'Nonreported Ethnicity Total',
+            'Nonreported Ethnicity %'],
+            ['Math Tested 4s', 'ELA Tested 4s'] + self._ethnicity_cols,
+            [(self._misc_features, {})])
+
+        for item in self._div_dict.values():
+            self._add_feature_node(item['new_col'], [item['new_col']],
+                [item['div_top'], item['div_bot']],
+                [(self._column_div, item)])
+
+        for item in self._bin_dict.values():
+            funs = [(self._column_bin, item)]
+            if item['new_col'] in self._cat_impute:
+                funs.append((self.cat_impute, {'col': item['new_col']}))
+            # Bins are cut before imputation, the same as the ETL process, so
+            # imputed columns are depended on the other way around below
+            deps = [] if item['cut_col'] in imputed else [item['cut_col']]
+            self._add_feature_node(item['new_col'], [item['new_col']], deps,
+                funs)
+
+        for item in self._impute_dict.values():
+            self._add_feature_node(item['col'], [item['col']],
+                [bin_item['new_col'] for bin_item in self._bin_dict.values()
+                 if bin_item['cut_col'] == item['col']],
+                [(self.imputer, item)])
+
+        for col in self._cat_impute:
+            if col not in self._feature_cols:
+                self._add_feature_node(col, [col], [],
+                    [(self.cat_impute, {'col': col})])
+
+        self._add_feature_node('_grade_combination',
+            ['Grade ' + str(grade) + total for grade in range(3, 8 + 1)
+             for total in [' 4s Total', ' 4s Tested Total']], [],
+            [(self._grade_combination, {})])
+
+        grades = sorted(self.lol_to_set(col='Grades', splitby=','))
+        self._add_feature_node('_grade_bools', ['Grades Mask'] + grades, [],
+            [(self._grade_bools, {})])
+
+        self._add_feature_node('_init_cit',
+            [item['new_col'] for item in self._cit_bin_dict.values()],
+            ['City'] + list(self._agg_dict), [(self._init_cit, {})])
+        self._add_feature_node('_init_dis',
+            [item['new_col'] for item in self._dis_bin_dict.values()],
+            ['District'] + list(self._agg_dict), [(self._init_dis, {})])
+
+        self._add_feature_node('_calculate_in_need', ['In Need Score'],
+            [item['pre_col'] for item in self._in_need_dict.values()] +
+            ['School Income Estimate'] +
+            [item['bin_col'] for item in self._bin_need_dict.values()] +
+            [item['bin_col'] for item in self._rating_need_dict.values()] +
+            ['Grades Mask'], [(self._calculate_in_need, {})])
+
+        return
+
+    def _add_feature_node(self, node, cols, deps, funs):
+        """
+        Adds a node to the lazy feature graph
+
+        :param node: Name of the node
+        :param cols: The columns the node creates
+        :param deps: The columns the node depends on
+        :param funs: List of (function, keyword arguments) pairs to run
+        """
+        self._feature_nodes[node] = {'deps': deps, 'funs': funs}
+        for col in cols:
+            self._feature_cols[col] = node
+
+        return
+
+    def _init_grade_data_list(self):
+        """
+        Instantiates a df_groupby() by grades dataframe for plotting, all the
+        grades are aggregated together with membership_agg()
+        """
+        # Kindergarten is written as both '0K' and 'K'
+        grades = ['SE', 'PK', ['0K', 'K'], '01', '02', '03', '04', '05', '06',
+                  '07', '08', '09', '10', '11', '12']
+        # Schools offering each grade, then schools not offering it
+        membership = pd.concat([self.offers_grades(grade) for grade in grades],
+                               axis=1)
+        membership = pd.concat([membership, ~membership], axis=1,
+                               ignore_index=True)
+        agg = self.membership_agg(membership, self._agg_dict)
+        agg = agg.rename(columns={'School Name': 'Count'})
+
+        # Laid out the same as df_groupby() on a boolean column
+        self.grade_data_list = []
+        for index in range(len(grades)):
+            grade_df = agg.iloc[[index + len(grades), index]]
+            grade_df.index = pd.Index([False, True])
+            self.grade_data_list.append(Data(grade_df[grade_df['Count'] > 0],
+                                             self.figwidth, self.figheight))
+        self._stamp_groups(['grade_data_list'])
+        return
+
+    def df_groupby(self, col, update_dict = None):
+        """
+        Group the data by the given column, and it will return an aggregated
+        copy of the dataframe stored within a Data class so the information can
+        be utilized with Data methods
+
+        :param col: The column to group the dataframe by
+        :param update_dict: If there are any columns not being aggregated, send
+        them as an argument here to be able to aggregate more information
+        """
+        agg_dict = dict(self._agg_dict)
+
         if update_dict != None:
             agg_dict.update(update_dict)
 
-        return_df = self.df.groupby(col).agg(agg_dict)
+        return_df = self.group_agg(col, agg_dict)
 
         # TODO: This isn't working and idk why tbh
         return_df = return_df.rename(columns={'School Name': 'Count'})
 
         return Data(return_df, self.figwidth, self.figheight)
 
-    def _init_dis(self):
+    def _init_dis(self, silence=True):
         """
         Instantiates the df_groupby() based on the District column
 
-        Also creates categorical sorting bins and then merges those to the main
-        DataFrame
+        Also creates categorical sorting bins and then attaches those to the
+        main DataFrame
+
+        :param silence: Whether or not to print the attach_cols() timing
         """
-        self.dis = self.df_groupby('District')
-        labels = ['lowest', 'low', 'medium', 'high']
-        bin_size = 4
-        self.dis._column_bin(new_col = 'Total 4 % District Bin',
-            cut_col='Total 4 %', bin_size= bin_size,
-            labels=labels)
-        self.dis._column_bin(new_col = 'School Income District Bin',
-            cut_col='School Income Estimate',
-            bin_size= bin_size, labels=labels)
-        del bin_size
-        del labels
-        self.data_object_col_merge(self.dis, 'Total 4 % District Bin',
-            on='District')
-        self.data_object_col_merge(self.dis, 'School Income District Bin',
-            on='District')
+        self.dis = self._group_data('District', self._dis_bin_dict)
+        self.attach_cols(self.dis, [item['new_col'] for item in
+            self._dis_bin_dict.values()], on='District', silence=silence)
+        self._stamp_groups(['dis'])
         return
 
-    def _init_cit(self):
+    def _init_cit(self, silence=True):
         """
         Instantiates a df_groupby() City dataframe for plotting
+
+        :param silence: Whether or not to print the attach_cols() timing
+        """
+        self.cit = self._group_data('City', self._cit_bin_dict)
+        self.attach_cols(self.cit, [item['new_col'] for item in
+            self._cit_bin_dict.values()], on='City', silence=silence)
+        self._set_cit(self.cit.df)
+        return
+
+    def _set_cit(self, cit_all):
+        """
+        Keeps every City for update(), and only the larger ones for plotting
+
+        :param cit_all: DataFrame of every City from df_groupby('City')
         """
-        self.cit = self.df_groupby('City')
-
-        labels = ['lowest', 'low', 'medium', 'high']
-        bin_size = 4
-        self.cit._column_bin(new_col = 'Total 4 % City Bin',
-            cut_col='Total 4 %', bin_size= bin_size,
-            labels=labels)
-        self.cit._column_bin(new_col = 'School Income City Bin',
-            cut_col='School Income Estimate',
-            bin_size= bin_size, labels=labels)
-        self.cit._column_bin(new_col = 'ENI City Bin',
-            cut_col='Economic Need Index',
-            bin_size= bin_size, labels=labels)
-        del bin_size
-        del labels
-        self.data_object_col_merge(self.cit, 'Total 4 % City Bin',
-            on='City')
-        self.data_object_col_merge(self.cit, 'School Income City Bin',
-            on='City')
-        self.data_object_col_merge(self.cit, 'ENI City Bin',
-            on='City')
-
-        self.cit.df = self.cit.df[self.cit.df['Count'] > 7]
+        self._cit_all = cit_all
+        self.cit.df = cit_all[cit_all['Count'] > 7]
         self.city_names = self.cit.df.index.values.tolist()
+        self._stamp_groups(['cit'])
+        return
+
+    def _group_data(self, col, bin_dict):
+        """
+        Returns df_groupby(col) with the bins of bin_dict cut on it
+
+        :param col: The column to group by
+        :param bin_dict: Bins to cut from the aggregates
+        """
+        group_data = self.df_groupby(col)
+        group_data.dict_fun_run(bin_dict, group_data._column_bin)
+        return group_data
+
+    def _stamp_groups(self, attrs):
+        """
+        Records that the plotting aggregates in attrs are up to date with
+        self.df, for the ones that have been built
+
+        :param attrs: List of attributes, such as ['dis', 'cit']
+        """
+        for attr in attrs:
+            if hasattr(self, attr):
+                self._group_versions[attr] = self.frame_version()
+
         return
+
+    def _stale(self, attr):
+        """
+        Returns whether the plotting aggregates in attr are missing or were
+        built before self.df last changed
+        """
+        return not hasattr(self, attr) or \
+            self._group_versions.get(attr) != self.frame_version()
+
+    def _update_groups(self, col, groups, group_df, bin_dict):
+        """
+        Re-aggregates only the given groups of a df_groupby() DataFrame,
+        re-cuts its bins and maps them back onto every school
+
+        :param col: The column group_df was grouped by
+        :param groups: The groups that had schools changed, added or removed
+        :param group_df: The DataFrame returned in a Data class by
+            df_groupby(col)
+        :param bin_dict: The bins cut from group_df and merged to self.df
+        :return: The updated group_df, and a boolean Series of the schools
+            whose bins changed
+        """
+        part = self.group_agg(col, self._agg_dict,
+            rows=self.df[col].isin(groups))
+        part = part.rename(columns={'School Name': 'Count'})
+        group_data = Data(pd.concat([group_df.drop(list(groups),
+            errors='ignore'), part]).sort_index(), self.figwidth,
+            self.figheight)
+        del part
+
+        # Bins depend on every group, but there are few groups to cut
+        group_data.dict_fun_run(bin_dict, group_data._column_bin)
+        bin_cols = [item['new_col'] for item in bin_dict.values()]
+        before = self.df[bin_cols].astype(object).fillna('')
+        self.attach_cols(group_data, bin_cols, on=col, silence=True)
+        changed = (before != self.df[bin_cols].astype(object).fillna('')).any(
+            axis=1)
+
+        return group_data.df, changed
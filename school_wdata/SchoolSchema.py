@@ -0,0 +1,134 @@
+import re
+import pandas as pd
+
+class SchoolSchema:
+    """
+    Column types for the 2016 School Explorer and the enrichment data, applied
+    while the CSV files are parsed so the DataFrames stay compact
+    """
+    def __init__(self):
+        """
+        Constructor method for SchoolSchema
+        """
+        ratings = ['Rigorous Instruction Rating',
+                   'Collaborative Teachers Rating',
+                   'Supportive Environment Rating',
+                   'Effective School Leadership Rating',
+                   'Strong Family-Community Ties Rating',
+                   'Trust Rating', 'Student Achievement Rating']
+        percents = ['Percent ELL', 'Percent Asian', 'Percent Black',
+                    'Percent Hispanic', 'Percent Black / Hispanic',
+                    'Percent White', 'Student Attendance Rate',
+                    'Percent of Students Chronically Absent',
+                    'Rigorous Instruction %', 'Collaborative Teachers %',
+                    'Supportive Environment %',
+                    'Effective School Leadership %',
+                    'Strong Family-Community Ties %', 'Trust %']
+        # For each source, the type of each column, types applied to every
+        # column matching a pattern, and the only columns to read (None for
+        # all of them). Columns that feed the In Need Score are left as
+        # float64 so scores do not change
+        self.schemas = {
+            'explorer': {
+                'dtype': {
+                    'category': ['City', 'Grades', 'Grade Low', 'Grade High',
+                                 'Community School?'] + ratings + percents,
+                    'int8': ['District'],
+                    'int32': ['Zip'],
+                    'float32': ['Average ELA Proficiency',
+                                'Average Math Proficiency']
+                },
+                # Student counts for each grade, subject and group
+                'patterns': {'int16': r'^Grade \d+ (ELA|Math)'},
+                'usecols': None
+            },
+            'retail': {
+                'dtype': {'category': ['County', 'Establishment Type']},
+                'usecols': ['County', 'Establishment Type', 'Zip Code']
+            },
+            'subway': {
+                'dtype': {},
+                'usecols': ['Station Name', 'Station Location']
+            },
+            'collisions': {
+                'dtype': {'str': ['ZIP CODE']},
+                'usecols': ['ZIP CODE', 'TIME']
+            }
+        }
+
+        return
+
+    def dtypes(self, source, columns):
+        """
+        Returns the types of the given columns of a source
+
+        :param source: A key of self.schemas
+        :param columns: The columns in the file
+        :return: Dictionary of column: type, for pd.read_csv()
+        """
+        schema = self.schemas[source]
+        dtype = {}
+        for kind, cols in schema['dtype'].items():
+            for col in cols:
+                if col in columns:
+                    dtype[col] = kind
+        for kind, pattern in schema.get('patterns', {}).items():
+            for col in columns:
+                if re.match(pattern, col):
+                    dtype[col] = kind
+
+        return dtype
+
+    def read_csv(self, path, source='explorer', silence=True, **kwargs):
+        """
+        Reads a CSV file with the types of its source applied while it is
+        parsed
+
+        :param path: The CSV file to read
+        :param source: A key of self.schemas
+        :param silence: Whether or not to print the memory used by the
+            DataFrame
+        :param kwargs: Sent to pd.read_csv(), such as chunksize
+        :return: The DataFrame, or an iterator of them if chunksize is sent
+
+        >>> df = SchoolSchema().read_csv('2016 School Explorer.csv')
+        """
+        usecols = self.schemas[source]['usecols']
+        columns = pd.read_csv(path, nrows=0, usecols=usecols).columns
+        dtype = self.dtypes(source, columns)
+        try:
+            df = pd.read_csv(path, dtype=dtype, usecols=usecols, **kwargs)
+        except ValueError:
+            # Integer columns with missing values are left for pandas to infer
+            dtype = {col: kind for col, kind in dtype.items()
+                     if not kind.startswith('int')}
+            df = pd.read_csv(path, dtype=dtype, usecols=usecols, **kwargs)
+
+        if silence is False and isinstance(df, pd.DataFrame):
+            print('%s: %.2f MB' % (path,
+                df.memory_usage(deep=True).sum() / 2**20))
+
+        return df
+
+    def memory_report(self, path, source='explorer', silence=False):
+        """
+        Compares the memory used by a CSV file read with pandas' inferred
+        types against the same file read with its schema
+
+        :param path: The CSV file to read
+        :param source: A key of self.schemas
+        :param silence: Whether or not to print the totals
+        :return: DataFrame of the bytes used by each column before and after
+        """
+        usecols = self.schemas[source]['usecols']
+        report = pd.DataFrame({
+            'Before': pd.read_csv(path,
+                usecols=usecols).memory_usage(deep=True),
+            'After': self.read_csv(path, source).memory_usage(deep=True)})
+
+        if silence is False:
+            before, after = report.sum()
+            print('%s: %.2f MB before, %.2f MB after (%.1f%% saved)' % (path,
+                before / 2**20, after / 2**20, 100 * (1 - after / before)))
+
+        return report
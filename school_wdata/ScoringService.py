@@ -0,0 +1,314 @@
+import asyncio
+import json
+import math
+import time
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+import pandas as pd
+from .WeightSweep import WeightSweep
+
+class ScoringService:
+    """
+    A local HTTP service that keeps a processed SchoolData in memory, so
+    scripts can look up scores without rebuilding it. What-if scoring
+    requests that arrive together are scored as one batch of weightings
+
+    GET  /score?code=01M015         Score and rank of a school
+    GET  /top?k=5&district=9&city=BRONX&grades=06,07&min_tested=50
+    GET  /groups?by=District        District or City aggregates
+    GET  /weights                   The current weight of every component
+    GET  /health                    Number of schools and reloads
+    POST /whatif {"weights": {component: weight}, "codes": [...], "k": 5}
+    POST /reload                    Rebuilds the data, then swaps it in
+    """
+    def __init__(self, build, host='127.0.0.1', port=8765, batch_window=0.002,
+        max_batch=256):
+        """
+        Constructor method for ScoringService
+
+        :param build: Function that returns a SchoolData, called on start and
+            on every reload
+        :param host: Address to listen on
+        :param port: Port to listen on
+        :param batch_window: Seconds a what-if request waits for others to be
+            batched with it
+        :param max_batch: The most what-if requests scored at once
+        """
+        self.build = build
+        self.host = host
+        self.port = port
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # Everything a request reads, replaced as a whole by a reload
+        self.state = None
+        self.reloads = 0
+        self._reload_lock = None
+        self._queue = None
+        self._routes = {('GET', '/score'): self.score,
+                        ('GET', '/top'): self.top,
+                        ('GET', '/groups'): self.groups,
+                        ('GET', '/weights'): self.weights,
+                        ('GET', '/health'): self.health,
+                        ('POST', '/whatif'): self.whatif,
+                        ('POST', '/reload'): self.reload}
+
+        return
+
+    def make_state(self, data):
+        """
+        Builds everything requests are answered from out of a SchoolData
+
+        :param data: SchoolData with its In Need Score calculated
+        :return: Dictionary of the data and its warm lookups
+        """
+        ranks = data.df['In Need Score'].rank(ascending=False, method='min')
+        codes = data.df['Location Code']
+
+        sweep = WeightSweep(data)
+
+        return {'data': data,
+                'sweep': sweep,
+                'components': {name: pos for pos, name in
+                    enumerate(sweep.components)},
+                'positions': {code: pos for pos, code in
+                    enumerate(codes.values)},
+                'scores': pd.DataFrame({'School Name':
+                    data.df['School Name'].values, 'In Need Score':
+                    data.df['In Need Score'].values, 'In Need Rank':
+                    ranks.values.astype(int)}, index=codes.values),
+                'groups': {'District': data.dis.df.to_json(orient='index'),
+                           'City': data.cit.df.to_json(orient='index')}}
+
+    async def start(self):
+        """
+        Builds the first state and starts listening
+
+        :return: The asyncio server
+        """
+        loop = asyncio.get_running_loop()
+        self._reload_lock = asyncio.Lock()
+        self._queue = asyncio.Queue()
+        self.state = await loop.run_in_executor(None, lambda:
+            self.make_state(self.build()))
+        self._batcher = asyncio.ensure_future(self._run_batches())
+
+        return await asyncio.start_server(self._handle, self.host, self.port)
+
+    def serve_forever(self):
+        """
+        Runs the service until it is interrupted
+        """
+        async def run():
+            server = await self.start()
+            print('Serving %d schools on http://%s:%d' % (len(
+                self.state['scores']), self.host, self.port))
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(run())
+
+        return
+
+    async def _handle(self, reader, writer):
+        """
+        Answers HTTP/1.1 requests on one connection until it is closed
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get(
+                    'content-length', 0)))
+
+                url = urlsplit(target)
+                query = {key: values[-1] for key, values in
+                         parse_qs(url.query).items()}
+                route = self._routes.get((method, url.path))
+                if route is None:
+                    status, result = 404, {'error': 'Not found: %s %s' %
+                        (method, url.path)}
+                else:
+                    try:
+                        status, result = 200, await route(query, json.loads(
+                            body) if body else {})
+                    except (KeyError, ValueError, TypeError) as error:
+                        status, result = 400, {'error': str(error)}
+
+                # Group aggregates are kept as JSON text
+                payload = (result if isinstance(result, str) else
+                    json.dumps(result)).encode()
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: '
+                    b'application/json\r\nContent-Length: %d\r\n\r\n' %
+                    (status, b'OK' if status == 200 else b'Error',
+                     len(payload)) + payload)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+        return
+
+    async def score(self, query, body):
+        """
+        Returns the score and rank of the school with Location Code code
+        """
+        row = self.state['scores'].loc[query['code']]
+
+        return {'Location Code': query['code'],
+                'School Name': row['School Name'],
+                'In Need Score': float(row['In Need Score']),
+                'In Need Rank': int(row['In Need Rank'])}
+
+    async def top(self, query, body):
+        """
+        Returns the schools most in need through SchoolData.top_in_need()
+        """
+        data = self.state['data']
+        district = query.get('district')
+        if district is not None:
+            district = [int(value) for value in district.split(',')]
+        city = query['city'].split(',') if 'city' in query else None
+        grades = query['grades'].split(',') if 'grades' in query else None
+        min_tested = float(query['min_tested']) if 'min_tested' in query \
+            else None
+        top = data.top_in_need(int(query.get('k', 5)), district=district,
+            city=city, grades=grades, min_tested=min_tested)
+
+        return json.loads(top[['Location Code', 'School Name', 'District',
+            'City', 'In Need Score']].to_json(orient='records'))
+
+    async def groups(self, query, body):
+        """
+        Returns the aggregates of every District or City
+        """
+        return self.state['groups'][query.get('by', 'District')]
+
+    async def weights(self, query, body):
+        """
+        Returns the current weight of every component of the score
+        """
+        return self.state['sweep'].weights.to_dict()
+
+    async def health(self, query, body):
+        return {'schools': len(self.state['scores']), 'reloads': self.reloads,
+                'queued': self._queue.qsize()}
+
+    async def whatif(self, query, body):
+        """
+        Scores every school with the given weights, components left out keep
+        their current weight. Returns the scores of codes if given, otherwise
+        the k schools most in need
+        """
+        # Everything is checked before queueing, so one bad request can't
+        # fail a batch
+        if not isinstance(body, dict):
+            raise TypeError('Expected a JSON object')
+        if not isinstance(body.get('weights', {}), dict):
+            raise TypeError('weights must be an object of component: weight')
+        if not isinstance(body.get('codes', []), list):
+            raise TypeError('codes must be a list of Location Codes')
+        k = body.get('k', 5)
+        if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+            raise ValueError('k must be a positive integer, got %r' % (k,))
+
+        state = self.state
+        weights = state['sweep'].weights.to_numpy().copy()
+        for name, weight in body.get('weights', {}).items():
+            if name not in state['components']:
+                raise KeyError('Unknown component: %s' % name)
+            weight = float(weight)
+            # NaN or infinite weights would score every school as NaN, which
+            # is not valid JSON
+            if not math.isfinite(weight):
+                raise ValueError('The weight of %s must be finite, got %r' %
+                    (name, weight))
+            weights[state['components'][name]] = weight
+        unknown = [code for code in body.get('codes', [])
+                   if code not in state['positions']]
+        if unknown:
+            raise KeyError('Unknown schools: %s' % unknown)
+        request = {'codes': body.get('codes'), 'k': k}
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((request, weights, future))
+
+        return await future
+
+    async def _run_batches(self):
+        """
+        Scores queued what-if requests together, waiting up to batch_window
+        after the first one for more to arrive
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Every request of a batch is answered from the same state
+            state = self.state
+            try:
+                scores, ranks = await loop.run_in_executor(None,
+                    state['sweep'].run, np.vstack([weights for _, weights, _
+                    in batch]))
+            except Exception as error:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for row, (request, _, future) in enumerate(batch):
+                if future.done():
+                    continue
+                try:
+                    future.set_result(self._whatif_result(state, request,
+                        scores[row], ranks[row]))
+                except Exception as error:
+                    future.set_exception(error)
+
+    def _whatif_result(self, state, request, scores, ranks):
+        """
+        Picks the schools a what-if request asked for out of its scenario
+
+        :param request: Dictionary of the checked 'codes', None if not given,
+            and 'k' of a what-if request
+        """
+        codes = state['scores'].index
+        if request['codes'] is not None:
+            # A reload may have dropped a school since it was checked
+            top = [state['positions'][code] for code in request['codes']
+                   if code in state['positions']]
+        else:
+            k = min(request['k'], len(ranks))
+            top = np.argpartition(ranks, k - 1)[:k]
+            top = top[np.argsort(ranks[top])]
+
+        return [{'Location Code': codes[pos], 'In Need Score':
+                 float(scores[pos]), 'In Need Rank': int(ranks[pos])}
+                for pos in top]
+
+    async def reload(self, query, body):
+        """
+        Builds a new state while the old one keeps answering requests, then
+        swaps it in with one assignment
+        """
+        async with self._reload_lock:
+            start = time.perf_counter()
+            state = await asyncio.get_running_loop().run_in_executor(None,
+                lambda: self.make_state(self.build()))
+            self.state = state
+            self.reloads += 1
+
+        return {'schools': len(state['scores']), 'reloads': self.reloads,
+                'seconds': time.perf_counter() - start}
@@ -0,0 +1,270 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# The component matrix of a WeightSweep, sent once to each worker process
+_matrix = None
+
+def _init_worker(matrix):
+    global _matrix
+    _matrix = matrix
+
+def _sensitivity_task(blocks, base, perturbed, spread, top_k, width):
+    """
+    Ranks schools under blocks of randomly perturbed weights, in a worker
+    process. Everything returned is a sum, so tasks merge by adding them
+
+    :param blocks: List of (SeedSequence, number of draws)
+    :param base: Array of the current weights
+    :param perturbed: Positions of the weights that are perturbed
+    :param spread: Weights are multiplied by a uniform factor in
+        [1 - spread, 1 + spread]
+    :param top_k: Ranks counted as the top
+    :param width: The number of ranks in each bin of the rank histogram
+    :return: Dictionary of the sums
+    """
+    n_schools = _matrix.shape[0]
+    bins = -(-n_schools // width)
+    sums = {'hist': np.zeros(n_schools * bins, dtype=np.int64),
+            'top': np.zeros(n_schools, dtype=np.int64),
+            'factor': np.zeros(len(perturbed)),
+            'factor_sq': np.zeros(len(perturbed)),
+            # Integers, so schools whose rank never moves have exactly 0
+            # variance
+            'rank': np.zeros(n_schools, dtype=np.int64),
+            'rank_sq': np.zeros(n_schools, dtype=np.int64),
+            'cross': np.zeros((len(perturbed), n_schools))}
+    offsets = np.arange(n_schools) * bins
+    for seed, size in blocks:
+        factors = np.random.default_rng(seed).uniform(1 - spread, 1 + spread,
+            (size, len(perturbed)))
+        weights = np.tile(base, (size, 1))
+        weights[:, perturbed] *= factors
+        # Normalizing from 0 to 100 does not change the ranks
+        ranks = WeightSweep.rank(weights @ _matrix.T)
+
+        # Row school, column bin: the times the school had a rank in the bin
+        sums['hist'] += np.bincount(((ranks - 1) // width + offsets).ravel(),
+            minlength=n_schools * bins)
+        sums['top'] += (ranks <= top_k).sum(axis=0)
+        sums['factor'] += factors.sum(axis=0)
+        sums['factor_sq'] += (factors ** 2).sum(axis=0)
+        sums['rank'] += ranks.sum(axis=0, dtype=np.int64)
+        sums['rank_sq'] += (ranks.astype(np.int64) ** 2).sum(axis=0)
+        sums['cross'] += factors.T @ ranks
+
+    return sums
+
+class WeightSweep:
+    """
+    Scores schools under many weightings of the In Need Score at once. The
+    components of the score are computed once, so each weighting, or scenario,
+    costs one row of a matrix multiply and a normalization from 0 to 100
+    """
+    def __init__(self, data, chunk_size=1024):
+        """
+        Constructor method for WeightSweep
+
+        :param data: A SchoolData object with its In Need Score calculated
+        :param chunk_size: The number of scenarios scored at a time, which
+            bounds the memory used while scoring
+        """
+        components = data.in_need_components()
+        self.index = components.index
+        self.components = components.columns
+        # Schools by components
+        self.matrix = components.to_numpy(dtype=np.float64)
+        # The weights the In Need Score uses now
+        self.weights = data.in_need_weights()
+        self.chunk_size = chunk_size
+
+        return
+
+    def weight_matrix(self, weights):
+        """
+        Returns weights as a scenarios by components array
+
+        :param weights: DataFrame of scenarios with component columns, where
+            missing components keep their current weight, or an array with one
+            column per component in the order of self.components
+        :return: NumPy array of scenarios by components
+        """
+        if isinstance(weights, pd.DataFrame):
+            unknown = weights.columns.difference(self.components)
+            if len(unknown) > 0:
+                raise KeyError('Unknown components: %s' % list(unknown))
+            weights = weights.reindex(columns=self.components).fillna(
+                self.weights)
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        if weights.shape[1] != len(self.components):
+            raise ValueError('Expected %d weights per scenario, got %d' %
+                (len(self.components), weights.shape[1]))
+
+        return weights
+
+    def chunks(self, weights, chunk_size=None):
+        """
+        Scores and ranks scenarios chunk_size at a time
+
+        :param weights: Scenarios, see weight_matrix()
+        :param chunk_size: Scenarios per chunk, self.chunk_size if None
+        :return: Generator of (first scenario, scores, ranks), where scores
+            and ranks are scenarios by schools arrays
+        """
+        weights = self.weight_matrix(weights)
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(weights), chunk_size):
+            raw = weights[start:start + chunk_size] @ self.matrix.T
+            scores = self.normalize(raw)
+            yield start, scores, self.rank(scores)
+
+    def run(self, weights, chunk_size=None):
+        """
+        Scores and ranks every scenario
+
+        :param weights: Scenarios, see weight_matrix()
+        :param chunk_size: Scenarios per chunk, self.chunk_size if None
+        :return: Arrays of scenarios by schools, the scores from 0 to 100 and
+            the ranks, where 1 is the school most in need
+
+        >>> sweep = WeightSweep(data)
+        >>> weights = np.tile(sweep.weights.values, (10000, 1))
+        >>> weights[:, 0] = np.linspace(0, 1.5, 10000)
+        >>> scores, ranks = sweep.run(weights)
+        """
+        weights = self.weight_matrix(weights)
+        scores = np.empty((len(weights), len(self.index)))
+        ranks = np.empty((len(weights), len(self.index)), dtype=np.int32)
+        for start, chunk_scores, chunk_ranks in self.chunks(weights,
+            chunk_size):
+            scores[start:start + len(chunk_scores)] = chunk_scores
+            ranks[start:start + len(chunk_ranks)] = chunk_ranks
+
+        return scores, ranks
+
+    def sensitivity(self, draws=100000, spread=0.2, top_k=50, seed=0,
+        components=None, workers=None, batch_size=1000, blocks_per_task=10,
+        rank_bins=200):
+        """
+        Monte Carlo sensitivity analysis of the rankings. Each draw multiplies
+        every perturbed weight by its own uniform factor in
+        [1 - spread, 1 + spread] and ranks the schools. Draws are scored in
+        batches of batch_size across workers processes
+
+        Every batch has its own random stream spawned from seed, so the same
+        seed, draws and batch_size give the same results with any number of
+        workers
+
+        Each school's ranks are counted in at most rank_bins bins of equal
+        width, so each worker holds schools x rank_bins counts. Percentile
+        ranks are exact when there are no more schools than rank_bins, and
+        otherwise interpolated within the bin they fall in
+
+        :param draws: The number of random weightings
+        :param spread: The largest change to a weight, 0.2 is +-20%
+        :param top_k: Ranks counted as the top for 'Top k Probability'
+        :param seed: Seed of the random draws
+        :param components: List of components to perturb, all if None
+        :param workers: Number of processes, os.cpu_count() if None
+        :param batch_size: Draws ranked at a time by a worker
+        :param blocks_per_task: Batches sent to a worker at a time
+        :param rank_bins: The most bins each school's ranks are counted in
+        :return: DataFrame of each school's median, 5th and 95th percentile
+            rank and probability of being in the top k, indexed like the
+            schools, and a Series of the importance of each perturbed weight:
+            the mean absolute correlation of its factor with the schools' ranks
+
+        >>> ranks, importance = WeightSweep(data).sensitivity(draws=100000,
+        ...     top_k=20, seed=1)
+        """
+        components = list(self.components) if components is None else \
+            components
+        perturbed = self.components.get_indexer(components)
+        if (perturbed < 0).any():
+            raise KeyError('Unknown components: %s' %
+                [col for col, pos in zip(components, perturbed) if pos < 0])
+
+        sizes = [batch_size] * (draws // batch_size)
+        if draws % batch_size:
+            sizes.append(draws % batch_size)
+        blocks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)),
+                          sizes))
+        tasks = [blocks[start:start + blocks_per_task]
+                 for start in range(0, len(blocks), blocks_per_task)]
+        n_schools = len(self.index)
+        width = -(-n_schools // rank_bins)
+        args = (self.weights.to_numpy(), perturbed, spread, top_k, width)
+
+        workers = workers or os.cpu_count()
+        if workers == 1:
+            _init_worker(self.matrix)
+            results = [_sensitivity_task(task, *args) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers,
+                initializer=_init_worker, initargs=(self.matrix,)) as pool:
+                # Merged in task order, so floating point sums are repeatable
+                results = list(pool.map(_sensitivity_task, tasks,
+                    *[[arg] * len(tasks) for arg in args]))
+        sums = {key: sum(result[key] for result in results)
+                for key in results[0]}
+
+        hist = sums['hist'].reshape(n_schools, -1)
+        cumulative = hist.cumsum(axis=1)
+        rows = np.arange(n_schools)
+        ranks = pd.DataFrame(index=self.index)
+        # The lowest rank that at least q of the draws were at or better than.
+        # Within its bin, the draws are taken to be spread evenly over the
+        # bin's ranks
+        for name, q in [('Median Rank', 0.5), ('5th Percentile Rank', 0.05),
+                        ('95th Percentile Rank', 0.95)]:
+            found = (cumulative < q * draws).sum(axis=1)
+            before = cumulative[rows, found] - hist[rows, found]
+            offset = np.ceil((q * draws - before) / hist[rows, found] *
+                width).astype(int)
+            ranks[name] = np.minimum(found * width + np.clip(offset, 1, width),
+                n_schools)
+        ranks['Top %d Probability' % top_k] = sums['top'] / draws
+
+        factor_mean = sums['factor'] / draws
+        rank_mean = sums['rank'] / draws
+        covariance = sums['cross'] / draws - np.outer(factor_mean, rank_mean)
+        factor_std = np.sqrt(sums['factor_sq'] / draws - factor_mean ** 2)
+        rank_std = np.sqrt(draws * sums['rank_sq'] - sums['rank'] ** 2) / draws
+        # Schools whose rank never moved have no correlation
+        rank_std[rank_std == 0] = np.nan
+        correlation = covariance / np.outer(factor_std, rank_std)
+        importance = pd.Series(np.nanmean(np.abs(correlation), axis=1),
+            index=components).sort_values(ascending=False)
+
+        return ranks, importance
+
+    @staticmethod
+    def normalize(raw):
+        """
+        Normalizes each scenario's raw scores from 0 to 100, the same way as
+        the In Need Score column
+
+        :param raw: Scenarios by schools array
+        """
+        low = raw.min(axis=1, keepdims=True)
+        high = raw.max(axis=1, keepdims=True)
+        # Scenarios that score every school the same are missing
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (raw - low) / (high - low) * 100
+
+    @staticmethod
+    def rank(scores):
+        """
+        Ranks the schools of each scenario, 1 being the highest score. Tied
+        schools are ranked in the order of the DataFrame
+
+        :param scores: Scenarios by schools array
+        :return: Array of ranks the same shape as scores
+        """
+        order = np.argsort(-scores, axis=1, kind='stable')
+        ranks = np.empty(scores.shape, dtype=np.int32)
+        np.put_along_axis(ranks, order, np.arange(1, scores.shape[1] + 1,
+            dtype=np.int32)[np.newaxis, :].repeat(len(scores), axis=0), axis=1)
+
+        return ranks
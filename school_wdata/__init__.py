@@ -1,3 +1,8 @@
 from .SchoolData import SchoolGraph
 from .SchoolData import SchoolOrganize
 from .SchoolData import SchoolData
+from .SchoolSchema import SchoolSchema
+from .ColumnCatalog import ColumnCatalog
+from .WeightSweep import WeightSweep
+from .ScoringService import ScoringService
+from .ChunkedScorer import ChunkedScorer
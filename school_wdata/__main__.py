@@ -0,0 +1,124 @@
+"""
+Scores School Explorer files from the command line, without any plotting
+
+python -m school_wdata "2016 School Explorer.csv" "2017 School Explorer.csv"
+    --workers 4 --format ndjson --output scores.ndjson
+
+Each file is scored by its own process, and its schools are written out as
+soon as it finishes, one line per school. The grocery store, subway and
+car-accident files are read from --data-dir. Timing for each file is printed
+to stderr
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+COLUMNS = ['Location Code', 'School Name', 'District', 'City',
+           'In Need Score']
+
+def score_file(path, columns, cache_dir=None):
+    """
+    Runs the ETL process over one School Explorer file
+
+    :param path: The School Explorer file to score
+    :param columns: Columns of the processed data to return
+    :param cache_dir: Folder of an ArtifactCache to share between runs, or None
+    :return: DataFrame of columns plus 'In Need Rank' and 'File', and the
+        seconds it took
+    """
+    from wdata import ArtifactCache
+    from school_wdata import SchoolData, SchoolSchema
+
+    start = time.perf_counter()
+    # Progress printed while building goes to stderr, stdout may hold scores
+    with contextlib.redirect_stdout(sys.stderr):
+        cache = ArtifactCache(cache_dir) if cache_dir is not None else None
+        df = SchoolSchema().read_csv(path)
+        data = SchoolData(df, 11, 7, cache=cache, workers=1)
+    scores = data.df[columns].copy()
+    scores['In Need Rank'] = data.df['In Need Score'].rank(ascending=False,
+        method='min').astype(int)
+    scores['File'] = path
+    scores = scores.sort_values('In Need Rank', kind='stable')
+
+    return scores, time.perf_counter() - start
+
+def write_scores(scores, out, fmt, header):
+    """
+    Writes scored schools to an open file, one line per school
+
+    :param scores: DataFrame from score_file()
+    :param out: File to write to
+    :param fmt: 'csv' or 'ndjson'
+    :param header: Whether to write the CSV header
+    """
+    if fmt == 'csv':
+        scores.to_csv(out, index=False, header=header)
+    else:
+        out.write(scores.to_json(orient='records', lines=True))
+        out.write('\n')
+    out.flush()
+
+    return
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m school_wdata',
+        description='Scores School Explorer files in parallel')
+    parser.add_argument('files', nargs='+',
+        help='School Explorer format CSV files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+        help='Number of files scored at the same time')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--output', default='-',
+        help='File to write scores to, - for stdout')
+    parser.add_argument('--columns', nargs='+', default=COLUMNS,
+        help='Columns written for each school')
+    parser.add_argument('--data-dir', default='.',
+        help='Folder of the grocery store, subway and car-accident files')
+    parser.add_argument('--cache', default=None,
+        help='ArtifactCache folder to reuse stages between runs')
+    args = parser.parse_args(argv)
+
+    # Workers read the enrichment files from data_dir, so every other path
+    # is made absolute. The caller's own working directory is left alone
+    files = [os.path.abspath(path) for path in args.files]
+    cache = os.path.abspath(args.cache) if args.cache is not None else None
+    data_dir = os.path.abspath(args.data_dir)
+
+    out = open(args.output, 'w', newline='') if args.output != '-' else \
+        sys.stdout
+    start = time.perf_counter()
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers,
+            initializer=os.chdir, initargs=(data_dir,)) as pool:
+            futures = {pool.submit(score_file, path, args.columns, cache): path
+                       for path in files}
+            header = True
+            for future in as_completed(futures):
+                try:
+                    scores, seconds = future.result()
+                except Exception as error:
+                    failed += 1
+                    print('%s: failed, %s' % (futures[future], error),
+                          file=sys.stderr)
+                    continue
+                write_scores(scores, out, args.format, header)
+                header = False
+                print('%s: %d schools in %.2f seconds' % (futures[future],
+                      len(scores), seconds), file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print('%d files in %.2f seconds' % (len(files) - failed,
+          time.perf_counter() - start), file=sys.stderr)
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Runs the local scoring service, loading the processed data once
+
+python serve.py --snapshot snapshot_folder
+python serve.py --explorer "2016 School Explorer.csv" --data-dir .
+
+POST /reload rebuilds the data the same way, from the snapshot folder or the
+School Explorer file as they are then, and swaps it in once it is built
+"""
+
+import argparse
+import os
+from school_wdata import ScoringService, SchoolData, SchoolSchema
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the scoring service')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--snapshot', help='Folder from save_snapshot()')
+    source.add_argument('--explorer', help='School Explorer file to build')
+    parser.add_argument('--data-dir', default='.',
+        help='Folder of the grocery store, subway and car-accident files')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--batch-window', type=float, default=0.002,
+        help='Seconds what-if requests wait to be batched together')
+    args = parser.parse_args()
+
+    snapshot = os.path.abspath(args.snapshot) if args.snapshot else None
+    explorer = os.path.abspath(args.explorer) if args.explorer else None
+    data_dir = os.path.abspath(args.data_dir)
+
+    def build():
+        # The enrichment files are read from the working directory, which
+        # is only changed while the data is built
+        cwd = os.getcwd()
+        os.chdir(data_dir)
+        try:
+            if snapshot is not None:
+                return SchoolData.load_snapshot(snapshot)
+            return SchoolData(SchoolSchema().read_csv(explorer), 11, 7)
+        finally:
+            os.chdir(cwd)
+
+    ScoringService(build, host=args.host, port=args.port,
+        batch_window=args.batch_window).serve_forever()
@@ -0,0 +1,150 @@
+"""
+Fixtures for the tests: a small, random School Explorer file in the 2016
+format with the grocery store, subway and car-accident files it is joined to
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+RATINGS = ['Not Meeting Target', 'Approaching Target', 'Meeting Target',
+           'Exceeding Target']
+CITIES = ['NEW YORK', 'BRONX', 'BROOKLYN', 'STATEN ISLAND', 'JAMAICA',
+          'FLUSHING', 'ASTORIA', 'SMALLTOWN']
+GRADES = ['PK', '0K', '01', '02', '03', '04', '05', '06', '07', '08', '09',
+          '10', '11', '12']
+GROUPS = ['American Indian or Alaska Native', 'Black or African American',
+          'Hispanic or Latino', 'Asian or Pacific Islander', 'White',
+          'Multiracial', 'Limited English Proficient',
+          'Economically Disadvantaged']
+
+def explorer_frame(n=240, seed=0):
+    """
+    Returns a DataFrame of n random schools in the 2016 School Explorer
+    format, with missing values in the columns that are imputed
+    """
+    rng = np.random.default_rng(seed)
+
+    def percents(missing=0.02):
+        values = np.array(['%d%%' % x for x in rng.integers(0, 100, n)],
+            dtype=object)
+        values[rng.random(n) < missing] = np.nan
+        return values
+
+    def ratings():
+        values = rng.choice(RATINGS, n).astype(object)
+        values[rng.random(n) < 0.03] = np.nan
+        return values
+
+    def grades():
+        low = rng.integers(0, 12)
+        offered = GRADES[low:rng.integers(low, 14) + 1]
+        if rng.random() < 0.1:
+            offered = ['SE'] + offered
+        return ','.join(offered)
+
+    df = {'Adjusted Grade': np.nan, 'New?': np.nan,
+          'Other Location Code in LCGMS': np.nan,
+          'School Name': ['School %d' % i for i in range(n)],
+          'SED Code': rng.integers(10 ** 9, 2 * 10 ** 9, n),
+          'Location Code': ['%02dX%03d' % (i % 100, i) for i in range(n)],
+          'District': rng.integers(1, 33, n),
+          'Latitude': 40.5 + rng.random(n) * 0.4,
+          'Longitude': -74.1 + rng.random(n) * 0.4,
+          'Address (Full)': 'x',
+          'City': rng.choice(CITIES, n, p=[.3, .2, .3, .05, .05, .04, .04,
+              .02]),
+          'Zip': rng.integers(10001, 10100, n),
+          'Grades': [grades() for _ in range(n)],
+          'Grade Low': 'PK', 'Grade High': '05',
+          'Community School?': rng.choice(['Yes', 'No'], n),
+          'Economic Need Index': np.where(rng.random(n) < 0.05, np.nan,
+              rng.random(n)),
+          'School Income Estimate': np.where(rng.random(n) < 0.3, np.nan,
+              np.array(['$%s' % format(x, ',.2f') for x in
+              rng.random(n) * 90000 + 10000], dtype=object))}
+    for col in ['Percent ELL', 'Percent Asian', 'Percent Black',
+                'Percent Hispanic', 'Percent Black / Hispanic',
+                'Percent White', 'Student Attendance Rate',
+                'Percent of Students Chronically Absent']:
+        df[col] = percents()
+    for col in ['Rigorous Instruction', 'Collaborative Teachers',
+                'Supportive Environment', 'Effective School Leadership',
+                'Strong Family-Community Ties', 'Trust']:
+        df[col + ' %'] = percents()
+        df[col + ' Rating'] = ratings()
+    df['Student Achievement Rating'] = ratings()
+    for col in ['Average ELA Proficiency', 'Average Math Proficiency']:
+        df[col] = np.where(rng.random(n) < 0.05, np.nan,
+            2 + rng.random(n) * 2)
+    for grade in range(3, 9):
+        for subject in ['ELA', 'Math']:
+            tested = rng.integers(0, 150, n)
+            name = 'Grade %d %s - All Students Tested' % (grade, subject)
+            if grade == 3 and subject == 'Math':
+                name = 'Grade 3 Math - All Students tested'
+            df[name] = tested
+            fours = (tested * rng.random(n) * 0.4).astype(int)
+            df['Grade %d %s 4s - All Students' % (grade, subject)] = fours
+            for group in GROUPS:
+                df['Grade %d %s 4s - %s' % (grade, subject, group)] = \
+                    (fours * rng.random(n) * 0.3).astype(int)
+
+    return pd.DataFrame(df)
+
+def write_sources(path, seed=0):
+    """
+    Writes the grocery store, subway and car-accident files to path
+    """
+    rng = np.random.default_rng(seed)
+    zips = np.arange(10001, 10100)
+    pd.DataFrame({'County': 'NY',
+                  'Establishment Type': rng.choice(['A ', 'JAC', 'A'], 2000),
+                  'Zip Code': rng.choice(zips, 2000)}).to_csv(
+        os.path.join(path, 'Retail_Food_Stores.csv'), index=False)
+    pd.DataFrame({'Station Name': ['St %d' % i for i in range(300)],
+                  'Station Location': ['(%f, %f)' % (40.5 + a, -74.1 + b)
+                      for a, b in rng.random((300, 2)) * 0.4]}).to_csv(
+        os.path.join(path, 'NYC_Transit_Subway_Entrance_And_Exit_Data.csv'),
+        index=False)
+    crash_zips = rng.choice(zips, 5000).astype(object)
+    crash_zips[rng.random(5000) < 0.1] = np.nan
+    pd.DataFrame({'DATE': '01/01/2017', 'TIME': '0:00', 'BOROUGH': 'X',
+                  'ZIP CODE': crash_zips, 'LATITUDE': 0.0,
+                  'LONGITUDE': 0.0}).to_csv(
+        os.path.join(path, 'nypd-motor-vehicle-collisions.csv'), index=False)
+
+@pytest.fixture(scope='session')
+def data_dir(tmp_path_factory):
+    """
+    A folder holding '2016 School Explorer.csv' and the enrichment files,
+    which is the working directory while the tests run
+    """
+    path = tmp_path_factory.mktemp('data')
+    write_sources(str(path))
+    explorer_frame().to_csv(path / '2016 School Explorer.csv', index=False)
+    cwd = os.getcwd()
+    os.chdir(path)
+    yield path
+    os.chdir(cwd)
+
+@pytest.fixture
+def explorer(data_dir):
+    """
+    The School Explorer DataFrame, read fresh for each test
+    """
+    return pd.read_csv(data_dir / '2016 School Explorer.csv')
+
+@pytest.fixture(scope='session')
+def school_data(data_dir):
+    """
+    A SchoolData built from the School Explorer file, shared by the tests
+    that only read it
+    """
+    from school_wdata import SchoolData
+
+    return SchoolData(pd.read_csv(data_dir / '2016 School Explorer.csv'),
+        11, 7)
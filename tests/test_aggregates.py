@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from wdata import Data
+
+def frame(n=300, seed=0):
+    """
+    Integer, float and categorical columns with missing values
+    """
+    rng = np.random.default_rng(seed)
+    floats = rng.random((n, 3))
+    floats[rng.random((n, 3)) < 0.1] = np.nan
+    df = pd.DataFrame({'i1': rng.integers(0, 50, n),
+                       'i2': rng.integers(0, 50, n),
+                       'f1': floats[:, 0], 'f2': floats[:, 1],
+                       'f3': floats[:, 2],
+                       'group': rng.integers(0, 12, n)})
+    rating = rng.choice(['a', 'b', 'c'], n).astype(object)
+    rating[rng.random(n) < 0.2] = np.nan
+    df['rating'] = rating
+    df['rated'] = pd.Categorical(rating, categories=['c', 'b', 'a'])
+
+    return df
+
+def test_column_sums_match_apply():
+    df = frame()
+    sum_dict = {'ints': ['i1', 'i2'], 'floats': ['f1', 'f2', 'f3'],
+                'both': ['i1', 'f1'], 'twice': ['f2', 'f2', 'i2']}
+    data = Data(df.copy(), 11, 7)
+
+    data.column_sums(sum_dict)
+
+    for new_col, cols in sum_dict.items():
+        expected = df[cols].apply(sum, axis=1)
+        pd.testing.assert_series_equal(data.df[new_col], expected,
+            check_names=False)
+    assert data.df['ints'].dtype == np.int64
+
+def test_membership_agg_matches_each_group():
+    df = frame()
+    # Overlapping groups, and one no row belongs to
+    membership = pd.DataFrame({'low': df['group'] < 6,
+        'even': df['group'] % 2 == 0, 'none': False,
+        'f1 missing': df['f1'].isna()})
+    agg_dict = {'i1': 'sum', 'f1': 'mean', 'f2': 'sum', 'f3': 'count',
+                'rating': 'count'}
+    data = Data(df.copy(), 11, 7)
+
+    result = data.membership_agg(membership, agg_dict)
+
+    for group in membership.columns:
+        rows = df[membership[group]]
+        for col, fun in agg_dict.items():
+            expected = rows[col].agg(fun)
+            assert np.isclose(result.loc[group, col], expected,
+                equal_nan=True), (group, col)
+
+def reference_mode(values):
+    """
+    The most common value, ties going to the first in sorted or category
+    order, NaN if every value is missing
+    """
+    modes = values.mode()
+
+    return modes.iloc[0] if len(modes) > 0 else np.nan
+
+def test_group_mode_matches_reference():
+    # Few rows per group, so many groups have tied modes
+    df = frame(n=120, seed=1)
+    df['group'] = np.repeat(np.arange(30), 4)
+    df.loc[df['group'] == 0, ['rating', 'rated']] = np.nan
+    data = Data(df.copy(), 11, 7)
+
+    result = data.group_agg('group', {'rating': 'mode', 'rated': 'mode',
+                                      'f1': 'mean'})
+
+    for col in ['rating', 'rated']:
+        expected = df.groupby('group')[col].agg(reference_mode)
+        assert result[col].astype(object).fillna('NA').tolist() == \
+            expected.astype(object).fillna('NA').tolist(), col
+
+def test_membership_mode_matches_reference():
+    df = frame(n=120, seed=2)
+    membership = pd.DataFrame({'group %d' % g: df['group'] == g
+                               for g in range(12)})
+    membership['all'] = True
+    data = Data(df.copy(), 11, 7)
+
+    result = data.membership_agg(membership, {'rating': 'mode',
+                                              'rated': 'mode'})
+
+    for group in membership.columns:
+        for col in ['rating', 'rated']:
+            expected = reference_mode(df.loc[membership[group], col])
+            assert result.loc[group, col] == expected or (
+                pd.isna(expected) and pd.isna(result.loc[group, col]))
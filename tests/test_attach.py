@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+from wdata import Data
+
+def test_attach_cols_matches_merge(capsys):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'key': rng.integers(0, 12, 200), 'x': rng.random(200)},
+                      index=rng.permutation(200))
+    # Key 11 is missing from the aggregate
+    agg = pd.DataFrame({'a': np.arange(11.0), 'b': list('abcdefghijk')},
+                       index=pd.Index(range(11), name='key'))
+    data = Data(df.copy(), 11, 7)
+
+    data.attach_cols(Data(agg, 11, 7), ['a', 'b'], on='key', silence=False)
+
+    expected = df.merge(agg, left_on='key', right_index=True, how='left')
+    pd.testing.assert_frame_equal(data.df, expected.loc[df.index])
+    assert capsys.readouterr().out.startswith('key: attached 2 columns (')
@@ -0,0 +1,44 @@
+import os
+import pandas as pd
+import pytest
+from wdata import ArtifactCache
+from school_wdata import SchoolData
+
+@pytest.mark.parametrize('corrupt', [lambda data: data[:len(data) // 2],
+    lambda data: b'not a pickle', lambda data: data[:1] + b'\x00' * 64])
+def test_corrupt_artifact_is_a_miss(tmp_path, corrupt):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    key = cache.key('stage', 1)
+    cache.save(key, pd.DataFrame({'a': range(100)}))
+    path = cache._artifact_path(key)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(corrupt(data))
+
+    assert cache.load(key) is None
+    assert not os.path.exists(path)
+
+def test_corrupt_artifact_is_recomputed(data_dir, explorer, tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    expected = SchoolData(explorer.copy(), 11, 7, cache=cache)
+    for entry in os.scandir(cache.directory):
+        if entry.name.endswith('.pkl'):
+            with open(entry.path, 'wb') as f:
+                f.write(b'truncated')
+
+    data = SchoolData(explorer.copy(), 11, 7, cache=cache)
+
+    pd.testing.assert_frame_equal(data.df, expected.df)
+
+def test_parse_errors_survive_a_cache_hit(data_dir, explorer, tmp_path):
+    explorer.loc[:4, 'Percent ELL'] = 'n/a'
+    explorer.loc[7, 'School Income Estimate'] = '$12,3x4'
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    built = SchoolData(explorer.copy(), 11, 7, cache=cache)
+
+    cached = SchoolData(explorer.copy(), 11, 7, cache=cache)
+
+    assert len(built.parse_errors) == 6
+    pd.testing.assert_frame_equal(cached.parse_errors, built.parse_errors)
+    pd.testing.assert_frame_equal(cached.df, built.df)
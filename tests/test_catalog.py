@@ -0,0 +1,87 @@
+from itertools import product
+import pytest
+from school_wdata import ColumnCatalog, SchoolData
+
+def string_columns(cols, subject='both', students='All Students', test=False,
+    grade=None):
+    """
+    column_generator() as it filtered the headers with substring tests
+    """
+    students = students + ' Tested' if test else '4s - ' + students
+    subjects = ['ELA', 'Math'] if subject == 'both' else [subject]
+    lst = [i for i in cols if students in i and
+           any(name in i for name in subjects)]
+    if grade is not None:
+        lst = [i for i in lst if 'Grade ' + str(grade) in i]
+
+    return lst
+
+def product_select(catalog, grades=None, subjects=None, groups=None,
+    fours=None, tested=None):
+    """
+    ColumnCatalog.select() as it looked up every combination of the fields
+    """
+    options = []
+    for field, chosen in zip(catalog.values, [grades, subjects, fours,
+                                              groups, tested]):
+        if chosen is None:
+            chosen = list(catalog.values[field])
+        elif not isinstance(chosen, list):
+            chosen = [chosen]
+        options.append(chosen)
+    if grades is None:
+        options[0] = sorted(options[0])
+
+    return [catalog._keys[key] for key in product(*options)
+            if key in catalog._keys]
+
+@pytest.fixture
+def data(explorer):
+    data = SchoolData(explorer, 11, 7, subset=True)
+    data._rename_cols()
+
+    return data
+
+@pytest.mark.parametrize('subject', ['both', 'Math', 'ELA'])
+@pytest.mark.parametrize('grade', [None, 3, 8])
+@pytest.mark.parametrize('students', ['All Students', 'Asian', 'White',
+                                      'Black or African American'])
+def test_column_generator_matches_substrings(data, subject, grade, students):
+    cols = list(data.df.columns)
+
+    result = data.column_generator(subject=subject, students=students,
+        grade=grade)
+
+    assert sorted(result) == sorted(string_columns(cols, subject, students,
+        grade=grade))
+    if students == 'All Students':
+        tested = data.column_generator(subject=subject, test=True,
+            grade=grade)
+        assert sorted(tested) == sorted(string_columns(cols, subject,
+            test=True, grade=grade))
+
+@pytest.mark.parametrize('fields', [
+    {}, {'groups': ['Asian or Pacific Islander']},
+    {'grades': [8, 3, 5], 'subjects': ['Math', 'ELA'], 'fours': True},
+    {'groups': 'All Students', 'tested': True},
+    {'grades': 4, 'groups': ['White', 'Hispanic or Latino', 'White']},
+    {'grades': [12], 'subjects': 'Math'}, {'tested': False, 'fours': False},
+    {'groups': ['Nobody']}])
+def test_select_matches_every_combination(data, fields):
+    catalog = data.column_catalog()
+    expected = product_select(catalog, **fields)
+
+    result = catalog.select(**fields)
+
+    # Repeated values picked the same column more than once before
+    assert result == list(dict.fromkeys(expected))
+
+def test_select_after_remove(data):
+    catalog = ColumnCatalog(data.df.columns)
+    removed = catalog.select(grades=[5, 6], fours=True)
+
+    catalog.remove(removed + ['Not a grade column'])
+
+    assert not set(removed) & set(catalog.select())
+    assert catalog.select(grades=5, fours=True) == []
+    assert len(catalog.select()) == len(catalog.fields)
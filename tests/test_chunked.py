@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from school_wdata import ChunkedScorer, SchoolData, SchoolSchema
+
+@pytest.mark.parametrize('chunksize', [37, 1000])
+def test_chunked_matches_school_data(data_dir, tmp_path, chunksize):
+    output = str(tmp_path / 'scores.csv')
+    ChunkedScorer('2016 School Explorer.csv', chunksize=chunksize,
+        silence=True).run(output)
+    data = SchoolData(SchoolSchema().read_csv('2016 School Explorer.csv'),
+        11, 7)
+
+    scores = pd.read_csv(output).set_index('Location Code')['In Need Score']
+    expected = data.df.set_index('Location Code')['In Need Score']
+    assert len(scores) == len(expected)
+    np.testing.assert_allclose(scores, expected.loc[scores.index],
+        atol=1e-9)
+
+def test_empty_file_is_refused(data_dir, tmp_path):
+    path = str(tmp_path / 'empty.csv')
+    pd.read_csv('2016 School Explorer.csv', nrows=0).to_csv(path,
+        index=False)
+
+    with pytest.raises(ValueError, match='No schools'):
+        ChunkedScorer(path, silence=True).run(str(tmp_path / 'scores.csv'))
+
+def test_missing_raw_scores_keep_the_range(data_dir, tmp_path, monkeypatch):
+    score_chunk = ChunkedScorer.score_chunk
+    calls = []
+
+    def with_missing(self, part):
+        # The first chunk has a school without a score, and the lowest score
+        calls.append(part)
+        raw = np.asarray(score_chunk(self, part), dtype=float)
+        if len(calls) == 1:
+            raw[0], raw[1] = np.nan, raw.min() - 1
+        return raw
+    monkeypatch.setattr(ChunkedScorer, 'score_chunk', with_missing)
+    output = str(tmp_path / 'scores.csv')
+
+    ChunkedScorer('2016 School Explorer.csv', chunksize=50,
+        silence=True).run(output)
+
+    scores = pd.read_csv(output)['In Need Score']
+    assert np.isnan(scores[0]) and scores[1] == 0
+    assert scores.min() == 0 and scores.max() == 100
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from wdata import Data
+
+def parse(df, col_dict):
+    data = Data(df, 11, 7)
+    failed = data.parse_columns(col_dict, silence=True)
+
+    return data.df, failed
+
+def test_strings():
+    df, failed = parse(pd.DataFrame({'pct': ['45%', '9%', np.nan],
+        'money': ['$1,250.50', np.nan, '$3'], 'flag': ['Yes', 'No', np.nan]}),
+        {'pct': 'percent', 'money': 'currency', 'flag': 'boolean'})
+
+    np.testing.assert_allclose(df['pct'], [0.45, 0.09, 0])
+    np.testing.assert_allclose(df['money'], [1250.5, 0, 3])
+    np.testing.assert_allclose(df['flag'], [1, 0, np.nan])
+    assert len(failed) == 0
+
+def test_float_columns():
+    df, failed = parse(pd.DataFrame({'pct': [45.0, np.nan, 9.0],
+        'money': [1250.5, 3.0, np.nan]}),
+        {'pct': 'percent', 'money': 'currency'})
+
+    np.testing.assert_allclose(df['pct'], [0.45, 0, 0.09])
+    np.testing.assert_allclose(df['money'], [1250.5, 3, 0])
+    assert len(failed) == 0
+
+def test_all_missing_columns():
+    df, failed = parse(pd.DataFrame({'pct': [np.nan] * 3,
+        'money': pd.Series([np.nan] * 3, dtype=object)}),
+        {'pct': 'percent', 'money': 'currency'})
+
+    np.testing.assert_allclose(df[['pct', 'money']], np.zeros((3, 2)))
+    assert len(failed) == 0
+
+def test_mixed_columns():
+    df, failed = parse(pd.DataFrame({'pct': ['45%', 9, np.nan, 'n/a'],
+        'other': [12.5, np.nan, 1.0, 3.0],
+        'money': ['$2,000', 500.0, np.nan, '$x']}),
+        {'pct': 'percent', 'other': 'percent', 'money': 'currency'})
+
+    np.testing.assert_allclose(df['pct'], [0.45, 0.09, 0, 0])
+    np.testing.assert_allclose(df['other'], [0.125, 0, 0.01, 0.03])
+    np.testing.assert_allclose(df['money'], [2000, 500, 0, 0])
+    assert failed[['index', 'column', 'value']].values.tolist() == \
+        [[3, 'pct', 'n/a'], [3, 'money', '$x']]
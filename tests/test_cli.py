@@ -0,0 +1,56 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from school_wdata import SchoolData
+from school_wdata.__main__ import main
+from conftest import explorer_frame
+
+@pytest.fixture
+def files(tmp_path):
+    """
+    Two School Explorer files in a folder without the enrichment files
+    """
+    paths = []
+    for seed in [1, 2]:
+        path = tmp_path / ('explorer %d.csv' % seed)
+        explorer_frame(n=120, seed=seed).to_csv(path, index=False)
+        paths.append(str(path))
+
+    return paths
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_scores_two_files(data_dir, files, tmp_path, monkeypatch, fmt):
+    monkeypatch.chdir(tmp_path)
+
+    status = main(files + ['--workers', '2', '--format', fmt, '--output',
+        'scores.out', '--data-dir', str(data_dir)])
+
+    # The caller's working directory is left where it was
+    assert status == 0 and os.getcwd() == str(tmp_path)
+    if fmt == 'csv':
+        scores = pd.read_csv('scores.out')
+    else:
+        scores = pd.read_json('scores.out', lines=True)
+    assert sorted(scores['File'].unique()) == sorted(files)
+    monkeypatch.chdir(data_dir)
+    for path in files:
+        expected = SchoolData(pd.read_csv(path), 11, 7).df
+        result = scores[scores['File'] == path]
+        assert result['In Need Rank'].is_monotonic_increasing
+        result = result.set_index('Location Code')
+        np.testing.assert_allclose(result.loc[expected['Location Code'],
+            'In Need Score'], expected['In Need Score'], rtol=1e-9)
+
+def test_failed_file_is_reported(data_dir, files, tmp_path, monkeypatch,
+    capsys):
+    monkeypatch.chdir(tmp_path)
+
+    status = main([files[0], 'missing.csv', '--workers', '2', '--data-dir',
+        str(data_dir)])
+
+    captured = capsys.readouterr()
+    assert status == 1 and os.getcwd() == str(tmp_path)
+    assert 'missing.csv: failed' in captured.err
+    assert len(pd.read_csv(io.StringIO(captured.out))) == 120
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from wdata import ArtifactCache
+from school_wdata import SchoolData
+from conftest import GRADES
+
+def contains(grades, grade):
+    """
+    Whether each Grades value lists grade, as str.contains on whole tokens
+    """
+    return grades.str.contains(r'(?:^|,)%s(?:,|$)' % grade).fillna(False).values
+
+def grades_in_need(grades):
+    return np.logical_or.reduce([contains(grades, grade) for grade in
+        ['SE', '06', '07', '08', '09', '10', '11', '12']]).astype(float)
+
+@pytest.fixture
+def explorer_grades(explorer):
+    # 'K' on its own, and a school with no Grades
+    explorer.loc[0, 'Grades'] = 'K,01,02'
+    explorer.loc[1, 'Grades'] = 'PK,0K'
+    explorer.loc[2, 'Grades'] = np.nan
+    explorer.loc[3, 'Grades'] = '06,07,06'
+
+    return explorer
+
+def test_grades_mask_matches_contains(explorer_grades):
+    data = SchoolData(explorer_grades.copy(), 11, 7, subset=True)
+    data._grade_bools()
+
+    for grade in GRADES + ['SE', 'K']:
+        expected = contains(explorer_grades['Grades'], grade)
+        assert (data.offers_grades(grade).values == expected).all(), grade
+        if grade in data.df.columns:
+            assert (data.df[grade].values == expected).all(), grade
+    assert data.offers_grades(['0K', 'K']).sum() == \
+        (contains(explorer_grades['Grades'], '0K') |
+         contains(explorer_grades['Grades'], 'K')).sum()
+    assert data.df.loc[2, 'Grades Mask'] == 0
+    # Repeated grades set their bit once
+    assert (data.offers_grades(['SE', 'SE']).values ==
+            contains(explorer_grades['Grades'], 'SE')).all()
+    assert data.df.loc[3, 'Grades Mask'] == data.grade_mask(['06', '07'])
+
+def test_grades_in_need_after_a_cache_hit(data_dir, explorer_grades,
+    tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    built = SchoolData(explorer_grades.copy(), 11, 7, cache=cache)
+
+    # _transform_data is loaded whole, so _grade_bools() never runs
+    cached = SchoolData(explorer_grades.copy(), 11, 7, cache=cache)
+
+    expected = grades_in_need(explorer_grades['Grades'])
+    for data in [built, cached]:
+        np.testing.assert_array_equal(
+            data.in_need_components()['Grades In Need'], expected)
+    np.testing.assert_array_equal(cached.df['In Need Score'],
+        built.df['In Need Score'])
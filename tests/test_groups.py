@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from school_wdata import SchoolData
+from test_update import merged
+
+def test_aggregates_are_current_after_build(data_dir, explorer, monkeypatch):
+    data = SchoolData(explorer, 11, 7)
+    built = []
+    group_data = data._group_data
+    monkeypatch.setattr(data, '_group_data',
+        lambda *args: built.append(args) or group_data(*args))
+
+    assert not data._stale('dis') and not data._stale('cit')
+    # The grade aggregates are only built for the first grade plot
+    assert data._stale('grade_data_list')
+    data._init_grade_data_list()
+    assert not data._stale('grade_data_list')
+    data.dis_bargraph('Economic Need Index')
+    data.city_bargraph('Economic Need Index')
+    assert built == []
+
+def test_update_refreshes_aggregates(data_dir, explorer):
+    data = SchoolData(explorer.copy(), 11, 7)
+    data._init_grade_data_list()
+    rows = explorer.sample(10, random_state=3)
+    rows['Economic Need Index'] = 0.01
+
+    data.update(rows)
+
+    # The District and City aggregates are updated in place, the grade
+    # aggregates are rebuilt on the next grade plot
+    assert not data._stale('dis') and not data._stale('cit')
+    assert data._stale('grade_data_list')
+    expected = SchoolData(merged(explorer, rows), 11, 7)
+    for left, right in [(data.dis.df, expected.dis.df),
+                        (data._cit_all, expected._cit_all)]:
+        np.testing.assert_allclose(left['Economic Need Index'],
+            right['Economic Need Index'], rtol=1e-12)
+    data._init_grade_data_list()
+    expected._init_grade_data_list()
+    for left, right in zip(data.grade_data_list, expected.grade_data_list):
+        pd.testing.assert_frame_equal(left.df, right.df)
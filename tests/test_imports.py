@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def loaded(code, cwd=ROOT):
+    """
+    Runs code in a fresh interpreter and returns which of matplotlib and
+    scikit-learn it imported
+    """
+    snippet = 'import sys\n%s\nprint(%r in sys.modules, %r in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', snippet % (code,
+        'matplotlib', 'sklearn')], cwd=cwd, capture_output=True, text=True,
+        check=True, env=dict(os.environ, PYTHONPATH=ROOT)).stdout.split()
+
+    return {'matplotlib': out[0] == 'True', 'sklearn': out[1] == 'True'}
+
+def test_import_loads_neither():
+    assert loaded('import wdata, school_wdata') == {'matplotlib': False,
+                                                    'sklearn': False}
+
+def test_build_without_plots_skips_matplotlib(data_dir):
+    code = ('import pandas as pd\nfrom school_wdata import SchoolData\n'
+            "SchoolData(pd.read_csv('2016 School Explorer.csv'), 11, 7)")
+
+    # Only the ball tree of subway stations needs scikit-learn
+    assert loaded(code, cwd=str(data_dir)) == {'matplotlib': False,
+                                               'sklearn': True}
+
+def test_first_plot_loads_matplotlib():
+    code = ('import pandas as pd\nfrom wdata import Data\n'
+            "data = Data(pd.DataFrame({'x': [1, 2]}), 11, 7, font_size=9)\n"
+            "assert 'matplotlib' not in sys.modules\n"
+            'from wdata.Graph import plt\n'
+            "assert plt.rcParams['font.size'] == 9")
+
+    assert loaded(code)['matplotlib']
@@ -0,0 +1,23 @@
+import pandas as pd
+from school_wdata import SchoolData
+
+def test_every_feature_matches_the_eager_column(explorer, school_data):
+    features = SchoolData(explorer.copy(), 11, 7, lazy=True)._feature_cols
+
+    # Each feature from a fresh graph, so it only gets its dependencies
+    for col in sorted(features):
+        data = SchoolData(explorer.copy(), 11, 7, lazy=True)
+        pd.testing.assert_series_equal(data.feature(col), school_data.df[col],
+            check_index_type=False)
+
+def test_features_are_computed_once(explorer, school_data):
+    data = SchoolData(explorer, 11, 7, lazy=True)
+    cols = ['In Need Score', 'Total 4 %', 'ENI Bin']
+
+    first = data.feature(cols)
+    computed = set(data._computed_nodes)
+
+    pd.testing.assert_frame_equal(data.feature(cols), first)
+    assert data._computed_nodes == computed
+    pd.testing.assert_frame_equal(first, school_data.df[cols],
+        check_index_type=False)
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+from school_wdata import SchoolData, SchoolSchema
+
+@pytest.fixture
+def explorer_with_errors(explorer):
+    explorer.loc[:3, 'Percent ELL'] = 'n/a'
+    explorer.loc[10, 'School Income Estimate'] = '$1,2x0'
+
+    return explorer
+
+@pytest.mark.parametrize('processes', [1, 2, 4])
+def test_partitioned_matches_serial(data_dir, explorer_with_errors, processes):
+    serial = SchoolData(explorer_with_errors.copy(), 11, 7)
+
+    data = SchoolData(explorer_with_errors.copy(), 11, 7,
+        processes=processes)
+
+    pd.testing.assert_frame_equal(data.df, serial.df)
+    pd.testing.assert_frame_equal(data.dis.df, serial.dis.df)
+    pd.testing.assert_frame_equal(data._cit_all, serial._cit_all)
+    pd.testing.assert_frame_equal(data.parse_errors, serial.parse_errors)
+    pd.testing.assert_frame_equal(data._missing, serial._missing)
+    assert len(serial.parse_errors) == 5
+
+def test_partitioned_matches_serial_with_schema(data_dir):
+    df = SchoolSchema().read_csv('2016 School Explorer.csv')
+    serial = SchoolData(df.copy(), 11, 7)
+
+    data = SchoolData(df.copy(), 11, 7, processes=3)
+
+    pd.testing.assert_frame_equal(data.df, serial.df)
+    pd.testing.assert_frame_equal(data.dis.df, serial.dis.df)
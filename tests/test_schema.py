@@ -0,0 +1,17 @@
+import numpy as np
+from school_wdata import SchoolData, SchoolSchema
+
+def test_typed_build_gives_the_same_scores(data_dir, school_data, explorer):
+    df = SchoolSchema().read_csv('2016 School Explorer.csv')
+
+    data = SchoolData(df, 11, 7)
+
+    assert df['City'].dtype == 'category' and df['District'].dtype == np.int8
+    assert df.memory_usage(deep=True).sum() < \
+        explorer.memory_usage(deep=True).sum()
+    assert (data.df['Location Code'] == school_data.df['Location Code']).all()
+    np.testing.assert_allclose(data.df['In Need Score'],
+        school_data.df['In Need Score'], rtol=1e-12)
+    for col in ['ENI Bin', 'Total 4 % City Bin', 'Total 4 % District Bin']:
+        assert (data.df[col].astype(str) ==
+                school_data.df[col].astype(str)).all(), col
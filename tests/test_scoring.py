@@ -0,0 +1,50 @@
+import numpy as np
+
+def reference_in_need(data):
+    """
+    The In Need Score computed the way it was before it was vectorized: one
+    normalized column at a time, and one row at a time for the bins, ratings
+    and grades
+    """
+    df = data.df
+    score = np.zeros(len(df))
+    for item in data._in_need_dict.values():
+        col = df[item['pre_col']]
+        normalized = (col.values - col.min()) / (col.max() - col.min())
+        if item.get('invert', False):
+            normalized = 1 - normalized
+        score += normalized * item['weight']
+
+    col = df[data._income_need_dict['col']]
+    reported = (col >= data._income_need_dict['greater_than']).values
+    subset = col[reported]
+    score[reported] += (1 - (subset.values - subset.min()) /
+        (subset.max() - subset.min())) * data._income_need_dict['weight']
+
+    for score_dict, levels in [(data._bin_need_dict, data._bin_levels),
+        (data._rating_need_dict, data._rating_levels)]:
+        for item in score_dict.values():
+            for row, value in enumerate(df[item['bin_col']]):
+                if value in levels:
+                    score[row] += item[levels[value]]
+
+    for row, grades in enumerate(df['Grades']):
+        if set(str(grades).split(',')) & set(
+            data._grades_need_dict['grades']):
+            score[row] += data._grades_need_dict['weight']
+
+    return (score - score.min()) / (score.max() - score.min()) * 100
+
+def test_in_need_score_matches_reference(school_data):
+    expected = reference_in_need(school_data)
+
+    np.testing.assert_allclose(school_data.df['In Need Score'].values,
+        expected, rtol=0, atol=1e-9)
+
+def test_components_times_weights_is_the_raw_score(school_data):
+    components = school_data.in_need_components()
+    weights = school_data.in_need_weights()
+
+    assert list(components.columns) == list(weights.index)
+    np.testing.assert_allclose(components.to_numpy() @ weights.to_numpy(),
+        school_data._raw_in_need.values, rtol=0, atol=1e-12)
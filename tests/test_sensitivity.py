@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from school_wdata import WeightSweep
+
+def drawn_ranks(sweep, draws, spread, seed, batch_size):
+    """
+    The rank of every school in every draw, made the way sensitivity() makes
+    them
+    """
+    sizes = [batch_size] * (draws // batch_size)
+    if draws % batch_size:
+        sizes.append(draws % batch_size)
+    base = sweep.weights.to_numpy()
+    ranks = []
+    for block, size in zip(np.random.SeedSequence(seed).spawn(len(sizes)),
+                           sizes):
+        factors = np.random.default_rng(block).uniform(1 - spread,
+            1 + spread, (size, len(base)))
+        ranks.append(WeightSweep.rank((base * factors) @ sweep.matrix.T))
+
+    return np.concatenate(ranks)
+
+@pytest.fixture(scope='module')
+def sweep(school_data):
+    return WeightSweep(school_data)
+
+def test_same_seed_gives_the_same_result_with_any_workers(sweep):
+    kwargs = {'draws': 2500, 'seed': 3, 'batch_size': 300,
+              'blocks_per_task': 2}
+
+    serial = sweep.sensitivity(workers=1, **kwargs)
+    parallel = sweep.sensitivity(workers=2, **kwargs)
+
+    pd.testing.assert_frame_equal(parallel[0], serial[0])
+    pd.testing.assert_series_equal(parallel[1], serial[1])
+
+def test_percentiles_match_the_drawn_ranks(sweep):
+    draws = 1500
+    ranks = np.sort(drawn_ranks(sweep, draws, 0.2, 5, 400), axis=0)
+
+    # A bin for every rank
+    result, importance = sweep.sensitivity(draws=draws, seed=5, top_k=10,
+        batch_size=400, workers=1, rank_bins=240)
+
+    for name, q in [('Median Rank', 0.5), ('5th Percentile Rank', 0.05),
+                    ('95th Percentile Rank', 0.95)]:
+        expected = ranks[int(np.ceil(q * draws)) - 1]
+        np.testing.assert_array_equal(result[name], expected, err_msg=name)
+    np.testing.assert_allclose(result['Top 10 Probability'],
+        (ranks <= 10).mean(axis=0))
+    assert list(importance.index) != [] and importance.notna().all()
+
+def test_binned_percentiles_stay_within_a_bin(sweep):
+    draws = 1500
+    exact = sweep.sensitivity(draws=draws, seed=5, batch_size=400,
+        workers=1, rank_bins=240)[0]
+
+    # 240 schools in 16 bins of 15 ranks
+    binned = sweep.sensitivity(draws=draws, seed=5, batch_size=400,
+        workers=1, rank_bins=16)[0]
+
+    for name in ['Median Rank', '5th Percentile Rank',
+                 '95th Percentile Rank']:
+        same_bin = (binned[name] - 1) // 15 == (exact[name] - 1) // 15
+        assert same_bin.all(), name
+        assert binned[name].between(1, len(binned)).all()
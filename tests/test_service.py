@@ -0,0 +1,49 @@
+import asyncio
+import json
+from school_wdata import ScoringService
+
+async def post(port, path, body):
+    """
+    Sends one POST request and returns its status and decoded JSON
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    payload = body.encode()
+    writer.write(b'POST %s HTTP/1.1\r\nContent-Length: %d\r\n'
+        b'Connection: close\r\n\r\n' % (path.encode(), len(payload)) + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = await reader.read()
+    writer.close()
+
+    return status, json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+def test_bad_whatif_requests_do_not_fail_their_batch(school_data):
+    bodies = ['{"k": 3}', '{"k": "x"}', '{"k": 0}', '[]', '5',
+              '{"weights": []}', '{"codes": "01X001"}', '{"k": true}',
+              '{"weights": {"Trust Rating: Meeting Target": 2}, "k": 2}',
+              '{"weights": {"Grades In Need": "nan"}}',
+              '{"weights": {"Grades In Need": NaN}}',
+              '{"weights": {"Grades In Need": -Infinity}}',
+              '{"weights": {"Grades In Need": "1e400"}}']
+
+    async def run():
+        # A long batch window so every request lands in the same batch
+        service = ScoringService(lambda: school_data, port=0,
+            batch_window=0.2)
+        server = await service.start()
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await asyncio.gather(*[post(port, '/whatif', body)
+                                          for body in bodies])
+        finally:
+            server.close()
+            service._batcher.cancel()
+
+    results = asyncio.run(run())
+
+    statuses = [status for status, _ in results]
+    assert statuses == [200, 400, 400, 400, 400, 400, 400, 400, 200, 400,
+                        400, 400, 400]
+    assert len(results[0][1]) == 3 and len(results[8][1]) == 2
+    assert 'must be finite' in results[-1][1]['error']
+    assert [row['In Need Rank'] for row in results[0][1]] == [1, 2, 3]
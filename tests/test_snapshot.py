@@ -0,0 +1,50 @@
+import shutil
+import pandas as pd
+import pytest
+from school_wdata import SchoolData
+
+pytest.importorskip('pyarrow')
+
+@pytest.fixture
+def snapshot(data_dir, school_data, tmp_path):
+    """
+    A snapshot of school_data, saved with a copy of the School Explorer file
+    the test can change
+    """
+    explorer = str(tmp_path / 'explorer.csv')
+    shutil.copy(data_dir / '2016 School Explorer.csv', explorer)
+    path = str(tmp_path / 'snapshot')
+    school_data.save_snapshot(path, explorer=explorer)
+
+    return path, explorer
+
+def test_snapshot_round_trip(snapshot, school_data, explorer):
+    data = SchoolData.load_snapshot(snapshot[0], explorer)
+
+    pd.testing.assert_frame_equal(data.df, school_data.df)
+    pd.testing.assert_frame_equal(data.dis.df, school_data.dis.df)
+    pd.testing.assert_frame_equal(data._missing, school_data._missing)
+
+def test_stale_explorer_file_is_refused_without_df(snapshot):
+    path, explorer = snapshot
+    SchoolData.load_snapshot(path)
+    with open(explorer, 'a') as f:
+        f.write('\n')
+
+    with pytest.raises(ValueError, match='School Explorer file'):
+        SchoolData.load_snapshot(path)
+
+def test_changed_df_is_refused(snapshot, explorer):
+    explorer.loc[0, 'School Name'] = 'Changed'
+
+    with pytest.raises(ValueError, match='School Explorer data'):
+        SchoolData.load_snapshot(snapshot[0], explorer)
+
+def test_update_after_load(snapshot, explorer):
+    data = SchoolData.load_snapshot(snapshot[0])
+    built = SchoolData(explorer.copy(), 11, 7)
+    rows = explorer.sample(5, random_state=0)
+    rows['Economic Need Index'] = 0.99
+
+    pd.testing.assert_frame_equal(data.update(rows), built.update(rows))
+    pd.testing.assert_frame_equal(data.df, built.df)
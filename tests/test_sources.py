@@ -0,0 +1,41 @@
+import threading
+import pandas as pd
+import pytest
+from school_wdata import SchoolData
+
+LOADERS = ['_load_retail', '_load_stations', '_load_crashes']
+
+def read(explorer, workers, patch=None):
+    data = SchoolData(explorer.copy(), 11, 7, subset=True)
+    if patch is not None:
+        for name in LOADERS:
+            setattr(data, name, patch(getattr(data, name)))
+    data.read_sources(workers=workers)
+
+    return data.df
+
+def test_concurrent_read_matches_serial(data_dir, explorer):
+    serial = read(explorer, workers=1)
+
+    for workers in [2, 3]:
+        pd.testing.assert_frame_equal(read(explorer, workers), serial)
+    assert {'Grocery Store Count', 'Closest Metro Station'} <= \
+        set(serial.columns)
+
+def test_files_are_read_at_the_same_time(data_dir, explorer):
+    # Every loader waits for the other two, which only returns if all
+    # three run at once
+    barrier = threading.Barrier(len(LOADERS), timeout=10)
+
+    def waits(load):
+        def wrapper(*args, **kwargs):
+            barrier.wait()
+            return load(*args, **kwargs)
+        return wrapper
+
+    pd.testing.assert_frame_equal(read(explorer, 3, waits),
+        read(explorer, 1))
+
+    barrier = threading.Barrier(len(LOADERS), timeout=0.5)
+    with pytest.raises(threading.BrokenBarrierError):
+        read(explorer, 1, waits)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from school_wdata import SchoolData
+
+def haversine(coords, stations, radius=3958.8):
+    """
+    Great-circle distance in miles from every co-ordinate to every station
+    """
+    lat1, lon1 = np.radians(coords).T[:, :, None]
+    lat2, lon2 = np.radians(stations).T[:, None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + \
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+
+    return 2 * radius * np.arcsin(np.sqrt(a))
+
+def test_closest_stations_match_brute_force(explorer):
+    explorer.loc[[3, 17], 'Latitude'] = np.nan
+    data = SchoolData(explorer, 11, 7, subset=True)
+    metro = pd.read_csv('NYC_Transit_Subway_Entrance_And_Exit_Data.csv')
+    stations = metro['Station Location'].str.strip('()').str.split(',',
+        expand=True).astype(float).values
+
+    closest = data.closest_stations(k=3)
+
+    distances = haversine(explorer[['Latitude', 'Longitude']].values,
+        stations)
+    order = np.argsort(distances, axis=1)
+    for i in range(3):
+        expected = np.take_along_axis(distances, order[:, i:i + 1], 1)[:, 0]
+        np.testing.assert_allclose(
+            closest['Metro Station %d Distance' % (i + 1)], expected,
+            rtol=1e-9)
+        located = explorer['Latitude'].notna()
+        assert (closest.loc[located, 'Metro Station %d' % (i + 1)] ==
+                metro['Station Name'].values[order[located, i]]).all()
+    assert closest.loc[[3, 17]].isna().all().all()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from school_wdata import WeightSweep
+
+def reference(school_data, weights):
+    """
+    Scores and ranks of one weighting from the components
+    """
+    raw = school_data.in_need_components().to_numpy() @ weights
+    scores = (raw - raw.min()) / (raw.max() - raw.min()) * 100
+    ranks = pd.Series(-scores).rank(method='first').to_numpy()
+
+    return scores, ranks
+
+def test_run_matches_components_times_weights(school_data):
+    sweep = WeightSweep(school_data, chunk_size=7)
+    rng = np.random.default_rng(0)
+    weights = sweep.weights.to_numpy() * rng.uniform(0, 2,
+        (20, len(sweep.components)))
+    weights[0] = sweep.weights.to_numpy()
+    # Ties broken in the order of the DataFrame
+    weights[1] = 0
+    weights[1, list(sweep.components).index('Grades In Need')] = 1
+
+    scores, ranks = sweep.run(weights)
+
+    np.testing.assert_allclose(scores[0], school_data.df['In Need Score'],
+        rtol=0, atol=1e-9)
+    for row in range(len(weights)):
+        expected_scores, expected_ranks = reference(school_data,
+            weights[row])
+        np.testing.assert_allclose(scores[row], expected_scores, rtol=0,
+            atol=1e-9)
+        np.testing.assert_array_equal(ranks[row], expected_ranks)
+
+def test_weight_frames_keep_missing_weights(school_data):
+    sweep = WeightSweep(school_data)
+    frame = pd.DataFrame({'Grades In Need': [0.0, 2.0]})
+    weights = np.tile(sweep.weights.to_numpy(), (2, 1))
+    weights[:, list(sweep.components).index('Grades In Need')] = [0.0, 2.0]
+
+    np.testing.assert_array_equal(sweep.run(frame)[1], sweep.run(weights)[1])
+    with pytest.raises(KeyError, match='Unknown components'):
+        sweep.run(pd.DataFrame({'Not a component': [1.0]}))
+    with pytest.raises(ValueError, match='weights per scenario'):
+        sweep.run(np.ones((2, 3)))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from conftest import CITIES
+
+def reference(df, k, district=None, city=None, grades=None, min_tested=None):
+    """
+    top_in_need() as a filter and a stable sort of the whole DataFrame
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if district is not None:
+        mask &= df['District'].isin(np.atleast_1d(district)).to_numpy()
+    if city is not None:
+        mask &= df['City'].isin(np.atleast_1d(city)).to_numpy()
+    if grades is not None:
+        grades = [grades] if isinstance(grades, str) else grades
+        mask &= np.logical_or.reduce([df[grade].to_numpy(dtype=bool)
+            for grade in grades if grade in df.columns] +
+            [np.zeros(len(df), dtype=bool)])
+    if min_tested is not None:
+        mask &= (df['Students Tested Total'] >= min_tested).to_numpy()
+
+    return df[mask].sort_values('In Need Score', ascending=False,
+        kind='stable').head(k)
+
+@pytest.mark.parametrize('filters', [
+    {}, {'district': 7}, {'district': [7, 31, 31]},
+    {'district': [7, 31, 31], 'city': ['BRONX', 'SMALLTOWN'],
+     'min_tested': 100},
+    {'city': 'BRONX', 'grades': ['06', '07', '08']},
+    {'city': ['BRONX', 'BRONX', 'NOWHERE'], 'district': [1, 2, 3, 4, 5]},
+    {'district': [99]}, {'grades': 'SE', 'min_tested': 300},
+    {'district': list(range(1, 33)) * 2, 'city': CITIES}])
+@pytest.mark.parametrize('k', [1, 5, 20, 1000])
+def test_top_in_need_matches_sort(school_data, filters, k):
+    result = school_data.top_in_need(k, **filters)
+
+    expected = reference(school_data.df, k, **filters)
+    assert list(result.index) == list(expected.index)
+
+def test_random_filters_match_sort(school_data):
+    rng = np.random.default_rng(0)
+    df = school_data.df
+    for _ in range(200):
+        filters = {}
+        if rng.random() < 0.7:
+            filters['district'] = list(rng.choice(df['District'].unique(),
+                rng.integers(1, 5)))
+        if rng.random() < 0.5:
+            filters['city'] = list(rng.choice(CITIES, rng.integers(1, 4)))
+        if rng.random() < 0.3:
+            filters['grades'] = list(rng.choice(['SE', 'PK', '06', '09'],
+                rng.integers(1, 3)))
+        if rng.random() < 0.3:
+            filters['min_tested'] = int(rng.integers(0, 400))
+        k = int(rng.integers(1, 40))
+
+        result = school_data.top_in_need(k, **filters)
+
+        assert list(result.index) == \
+            list(reference(df, k, **filters).index), filters
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from school_wdata import SchoolData
+
+def merged(explorer, rows):
+    """
+    The School Explorer data with rows replacing the schools they share a
+    Location Code with, and the rest added to the end
+    """
+    full = explorer.set_index('Location Code')
+    rows = rows.set_index('Location Code')
+    replaced = rows.index.isin(full.index)
+    full.loc[rows.index[replaced]] = rows[replaced]
+
+    return pd.concat([full, rows[~replaced]]).reset_index()
+
+def assert_same_data(data, expected):
+    assert list(data.df['Location Code']) == \
+        list(expected.df['Location Code'])
+    for col in expected.df.columns:
+        left, right = data.df[col], expected.df[col]
+        if pd.api.types.is_float_dtype(right):
+            np.testing.assert_allclose(left.astype(float), right, rtol=0,
+                atol=1e-9, err_msg=col)
+        else:
+            assert (left.astype(object).fillna('NA').values ==
+                    right.astype(object).fillna('NA').values).all(), col
+
+def test_update_matches_rebuild(data_dir, explorer):
+    data = SchoolData(explorer.copy(), 11, 7)
+    rows = explorer.sample(30, random_state=1).copy()
+    # Moves the bounds the ENI Bin is cut from, and the median missing
+    # Economic Need Index values are imputed with
+    rows['Economic Need Index'] = rows['Economic Need Index'] * 0.5
+    rows.loc[rows.index[:8], 'Economic Need Index'] = np.nan
+    rows.loc[rows.index[:10], 'Trust Rating'] = 'Exceeding Target'
+    rows.loc[rows.index[10:14], 'Trust Rating'] = np.nan
+    added = explorer.iloc[:2].copy()
+    added['Location Code'] = ['NEW1', 'NEW2']
+    added['Grades'] = ['06,07', 'SE']
+    rows = pd.concat([rows, added])
+
+    data.update(rows)
+    expected = SchoolData(merged(explorer, rows), 11, 7)
+
+    assert_same_data(data, expected)
+    pd.testing.assert_frame_equal(data._missing, expected._missing)
+
+def test_repeated_updates_match_rebuild(data_dir, explorer):
+    data = SchoolData(explorer.copy(), 11, 7)
+    current = explorer
+    for seed in range(3):
+        rows = explorer.sample(10, random_state=seed).copy()
+        rows['Economic Need Index'] = np.where(np.arange(10) < 3, np.nan,
+            rows['Economic Need Index'] * (1 + seed))
+        data.update(rows)
+        current = merged(current, rows)
+
+    assert_same_data(data, SchoolData(current, 11, 7))
+
+def test_update_with_the_same_rows_changes_nothing(data_dir, explorer):
+    data = SchoolData(explorer.copy(), 11, 7)
+    scores = data.df['In Need Score'].copy()
+
+    for size in [1, 5, 10, 40]:
+        for seed in range(5):
+            changed = data.update(explorer.sample(size, random_state=seed))
+
+            assert len(changed) == 0
+    np.testing.assert_allclose(data.df['In Need Score'], scores, rtol=0,
+        atol=1e-9)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+class ArtifactCache:
+    """
+    A content-addressed, on-disk store for the DataFrames produced by
+    expensive ETL stages. Artifacts are keyed by a hash of the stage's input
+    files and data plus a version for the stage's code, and the least recently
+    used artifacts are evicted once the store grows past its size cap
+    """
+    def __init__(self, directory='.wdata_cache', max_bytes=2**30):
+        """
+        Constructor method for ArtifactCache
+
+        :param directory: Folder the artifacts are stored in
+        :param max_bytes: Size cap for all artifacts, in bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        # File hashes are remembered by path, size and modification time so
+        # large inputs are only re-read when they change
+        self._hash_path = os.path.join(self.directory, 'file_hashes.json')
+        try:
+            with open(self._hash_path) as f:
+                self._file_hashes = json.load(f)
+        except (OSError, ValueError):
+            self._file_hashes = {}
+
+        return
+
+    def file_hash(self, path, block_size=2**20):
+        """
+        Returns the sha256 hash of a file's contents
+
+        :param path: The file to hash
+        :param block_size: The number of bytes read at once
+        :return: Hex digest of the file contents
+        """
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        path = os.path.abspath(path)
+        if path in self._file_hashes and \
+            self._file_hashes[path]['stamp'] == stamp:
+            return self._file_hashes[path]['hash']
+
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                sha.update(block)
+
+        self._file_hashes[path] = {'stamp': stamp, 'hash': sha.hexdigest()}
+        with open(self._hash_path, 'w') as f:
+            json.dump(self._file_hashes, f)
+
+        return self._file_hashes[path]['hash']
+
+    def key(self, stage, version, files=(), df=None):
+        """
+        Builds the key for a stage from everything its output depends on
+
+        :param stage: Name of the stage
+        :param version: Version of the stage's code, bump it when the code
+            changes
+        :param files: Input files read by the stage
+        :param df: DataFrame of the inputs taken from the dataset
+        :return: Hex digest used as the artifact name
+        """
+        sha = hashlib.sha256(('%s:%s' % (stage, version)).encode())
+        for path in files:
+            sha.update(self.file_hash(path).encode())
+        if df is not None:
+            sha.update(','.join(map(str, df.columns)).encode())
+            sha.update(pd.util.hash_pandas_object(df, index=False).values)
+
+        return stage.strip('_') + '-' + sha.hexdigest()
+
+    def load(self, key):
+        """
+        Returns the artifact stored under key, or None if there isn't one
+
+        :param key: Key built by key()
+        :return: The stored DataFrame, or tuple holding one, or None
+        """
+        path = self._artifact_path(key)
+        try:
+            artifact = pd.read_pickle(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # A truncated or corrupt artifact is a miss, and is removed so the
+            # stage is recomputed and stored again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        # Mark as recently used for eviction
+        os.utime(path)
+
+        return artifact
+
+    def contains(self, key):
+        """
+        Returns whether an artifact is stored under key
+
+        :param key: Key built by key()
+        """
+        return os.path.exists(self._artifact_path(key))
+
+    def save(self, key, df):
+        """
+        Stores a DataFrame under key and evicts old artifacts if the store is
+        over its size cap
+
+        :param key: Key built by key()
+        :param df: DataFrame, or tuple holding one and other picklable values,
+            to store
+        """
+        path = self._artifact_path(key)
+        # Write then rename so a crash never leaves half an artifact behind
+        pd.to_pickle(df, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        self.evict()
+
+        return
+
+    def evict(self):
+        """
+        Removes the least recently used artifacts until the store fits within
+        max_bytes
+        """
+        artifacts = [entry for entry in os.scandir(self.directory)
+                     if entry.name.endswith('.pkl')]
+        artifacts.sort(key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in artifacts)
+        for entry in artifacts:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+
+        return
+
+    def clear(self):
+        """
+        Removes every artifact in the store
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                os.remove(entry.path)
+
+        return
+
+    def _artifact_path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
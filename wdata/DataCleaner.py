@@ -1,6 +1,6 @@
 from .DataContainer import DataContainer
-from sklearn.impute import SimpleImputer
 import numpy as np
+import pandas as pd
 
 class DataCleaner(DataContainer):
     """
@@ -10,8 +10,17 @@ class DataCleaner(DataContainer):
     def __init__(self, df,**kwargs):
         super().__init__(df, **kwargs)
         # An anonymous function that can be used to get back the most
-        # common value in a categorical column
+        # common value in a categorical column. Use 'mode' in group_agg()
+        # aggregations for the same result computed for every group at once
         self.com_fun = lambda x:x.value_counts().index[0]
+        # How parse_columns() converts each kind of string column. Numeric
+        # kinds strip the pattern and divide by divisor, mapped kinds look
+        # each value up in map
+        self._parsers = {
+            'percent': {'strip': '%', 'divisor': 100},
+            'currency': {'strip': '[$,]', 'divisor': 1},
+            'boolean': {'map': {'Yes': 1, 'No': 0}}
+        }
 
     def dollarsToDigits(self, string):
         """
@@ -97,7 +106,72 @@ class DataCleaner(DataContainer):
             return(0)
         return(float(string) / 100)
 
-    def imputer(self, col, miss_value=np.NaN, strat='median'):
+    def parse_columns(self, col_dict, silence=False):
+        """
+        Converts string columns to numbers, with one vectorized pass over all
+        the columns of each kind in self._parsers. Missing values become 0 for
+        numeric kinds, the same as percents_to_floats and dollarsToDigits.
+        Values that are already numbers are only divided by the divisor
+
+        Cells that cannot be parsed do not raise an error, they become 0 (NaN
+        for mapped kinds) and are returned
+
+        :param col_dict: Dictionary of column: kind of column
+        :param silence: Whether or not to print the number of cells that
+            could not be parsed
+        :return: DataFrame of the index, column and value of every cell that
+            could not be parsed
+
+        >>> data.parse_columns({'Percent ELL': 'percent',
+        ...     'School Income Estimate': 'currency'})
+        """
+        failed = []
+        for kind, parser in self._parsers.items():
+            cols = [col for col in col_dict if col_dict[col] == kind]
+            if len(cols) == 0:
+                continue
+            # Every column of this kind stacked end to end
+            values = pd.Series(self.df[cols].values.ravel(order='F'))
+            if 'map' in parser:
+                numbers = values.map(parser['map'])
+                bad = values.notna() & numbers.isna()
+            else:
+                try:
+                    # Non-string values come back as NaN from the .str
+                    # accessor
+                    text = values.str.replace(parser['strip'], '',
+                        regex=True)
+                except AttributeError:
+                    # In the event that no value is a string, such as a
+                    # column read as floats because all of it is missing
+                    text = pd.Series(np.nan, index=values.index, dtype=object)
+                numbers = pd.to_numeric(text, errors='coerce')
+                # Values that are already numbers are in the same units as
+                # the strings, '45%' and 45 are both 0.45
+                numeric = text.isna() & values.notna()
+                numbers[numeric] = pd.to_numeric(values[numeric],
+                    errors='coerce')
+                bad = values.notna() & numbers.isna()
+                numbers = numbers.fillna(0) / parser['divisor']
+
+            rows = np.tile(self.df.index.values, len(cols))
+            failed.append(pd.DataFrame({'index': rows[bad.values],
+                'column': np.repeat(cols, len(self.df))[bad.values],
+                'value': values[bad].values}))
+            self.df[cols] = numbers.values.reshape((len(self.df), len(cols)),
+                order='F')
+        self._bump_version()
+
+        if len(failed) > 0:
+            failed = pd.concat(failed, ignore_index=True)
+        else:
+            failed = pd.DataFrame(columns=['index', 'column', 'value'])
+        if silence is False and len(failed) > 0:
+            print("%d cells could not be parsed" % len(failed))
+
+        return failed
+
+    def imputer(self, col, miss_value=np.nan, strat='median'):
         """
         Runs an imputation strategy of the user's choice and assigns that back
         to the column, replacing all missing values
@@ -107,10 +181,14 @@ class DataCleaner(DataContainer):
             imputation
         :param strat: The strategy to use to replace the missing value
         """
+        # Imported here so only data that is imputed pays for scikit-learn
+        from sklearn.impute import SimpleImputer
+
         imputed_col = SimpleImputer(missing_values=miss_value,
                                     strategy=strat)
         imputed_col.fit(self.df[[col]])
         self.df[col] = imputed_col.transform(self.df[[col]])
+        self._bump_version()
 
         return
 
@@ -122,5 +200,148 @@ class DataCleaner(DataContainer):
             likely value
         """
         self.df[col] = self.df[col].fillna(self.df[col].mode().iloc[0])
+        self._bump_version()
 
         return
+
+    def membership_agg(self, membership, agg_dict):
+        """
+        Aggregates columns over groups that may overlap, such as the schools
+        offering each grade, in one pass instead of a groupby() per group.
+        Counts, sums and means are matrix products of the membership matrix
+        with the columns, and 'mode' is the argmax over the one-hot category
+        codes of each column
+
+        :param membership: Boolean DataFrame with a column for each group and
+            a row for each row of self.df
+        :param agg_dict: Dictionary of column: aggregation, the same as for
+            group_agg(). Aggregations other than 'count', 'sum', 'mean' and
+            'mode' are run on each group separately
+        :return: DataFrame with a row for each group and a column for each
+            column of agg_dict
+        """
+        weights = membership.to_numpy(dtype=float).T
+        result = {}
+
+        counted = [col for col, fun in agg_dict.items() if fun == 'count']
+        if len(counted) > 0:
+            counts = weights @ self.df[counted].notna().to_numpy(dtype=float)
+            for index, col in enumerate(counted):
+                result[col] = counts[:, index].astype(np.int64)
+
+        numeric = [col for col, fun in agg_dict.items()
+                   if fun in ('sum', 'mean')]
+        if len(numeric) > 0:
+            block = self.df[numeric].to_numpy(dtype=float)
+            present = ~np.isnan(block)
+            sums = weights @ np.where(present, block, 0)
+            counts = weights @ present
+            del block, present
+            for index, col in enumerate(numeric):
+                if agg_dict[col] == 'sum':
+                    result[col] = sums[:, index]
+                    if pd.api.types.is_integer_dtype(self.df[col]):
+                        result[col] = result[col].astype(np.int64)
+                else:
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        result[col] = sums[:, index] / counts[:, index]
+
+        modes = [col for col, fun in agg_dict.items()
+                 if fun == 'mode' or fun is self.com_fun]
+        if len(modes) > 0:
+            # One-hot codes of every column side by side, so all the modes
+            # come from a single product
+            categories, offsets, hot = [], [0], []
+            for col in modes:
+                codes, uniques = pd.factorize(self.df[col], sort=True)
+                categories.append(uniques)
+                offsets.append(offsets[-1] + len(uniques))
+                hot.append((codes, offsets[-2]))
+            onehot = np.zeros((len(self.df), offsets[-1]))
+            for codes, offset in hot:
+                rows = np.flatnonzero(codes >= 0)
+                onehot[rows, codes[rows] + offset] = 1
+            code_counts = weights @ onehot
+            del onehot
+            for index, col in enumerate(modes):
+                counts = code_counts[:, offsets[index]:offsets[index + 1]]
+                # Ties go to the first category
+                values = np.asarray(categories[index], dtype=object)[
+                    counts.argmax(axis=1)]
+                values[counts.max(axis=1) == 0] = np.nan
+                result[col] = values
+
+        for col, fun in agg_dict.items():
+            if col not in result:
+                result[col] = [self.df.loc[membership[group].values, col].agg(
+                    fun) for group in membership.columns]
+
+        return pd.DataFrame(result, index=membership.columns)[list(agg_dict)]
+
+    def group_agg(self, by, agg_dict, rows=None):
+        """
+        Groups self.df and aggregates it the same as groupby().agg(), with
+        the named aggregation 'mode' added for the most common value of a
+        column. Grouping all rows by a column is cached until self.df changes
+
+        :param by: The column, or Series, to group by
+        :param agg_dict: Dictionary of column: aggregation
+        :param rows: Boolean Series of the rows to aggregate, all if None
+        :return: DataFrame with a row for each group
+        """
+        spec = tuple(agg_dict.items())
+        try:
+            hash(spec)
+        except TypeError:
+            # Aggregations given as lists are not cached
+            spec = None
+        if isinstance(by, str) and rows is None and spec is not None:
+            # Results for a column of the current frame are reused
+            return self.cached_groupby(by, spec,
+                lambda: self._group_agg(self.df, by, agg_dict))
+
+        df = self.df if rows is None else self.df[rows]
+        if isinstance(by, pd.Series) and rows is not None:
+            by = by[rows]
+
+        return self._group_agg(df, by, agg_dict)
+
+    def _group_agg(self, df, by, agg_dict):
+        # observed=True keeps categorical columns from creating empty groups
+        grouped = df.groupby(by, observed=True)
+
+        others = {col: fun for col, fun in agg_dict.items() if fun != 'mode'}
+        if len(others) > 0:
+            result = grouped.agg(others)
+        else:
+            result = pd.DataFrame(index=grouped.size().index)
+
+        modes = [col for col in agg_dict if col not in others]
+        if len(modes) > 0:
+            group_codes = grouped.ngroup().to_numpy()
+            for col in modes:
+                result[col] = self._group_mode(df[col], group_codes,
+                                               len(result))
+
+        return result[list(agg_dict)]
+
+    def _group_mode(self, series, group_codes, n_groups):
+        """
+        Returns the most common value of series in each group with a single
+        bincount over (group, category code) pairs. Ties go to the first
+        category, and groups with only missing values get NaN
+
+        :param series: The column to take the mode of
+        :param group_codes: Array of each row's group number, -1 for none
+        :param n_groups: The number of groups
+        :return: Array of the mode of each group
+        """
+        codes, uniques = pd.factorize(series, sort=True)
+        valid = (codes >= 0) & (group_codes >= 0)
+        counts = np.bincount(group_codes[valid] * len(uniques) + codes[valid],
+                             minlength=n_groups * len(uniques)).reshape(
+                             n_groups, len(uniques))
+        modes = np.asarray(uniques, dtype=object)[counts.argmax(axis=1)]
+        modes[counts.max(axis=1) == 0] = np.nan
+
+        return modes
@@ -1,5 +1,20 @@
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
+import time
+
+def set_display_options(max_rows=500, max_columns=500, width=1000):
+    """
+    Sets how pandas displays DataFrames, for notebooks and interactive use.
+    Nothing in wdata changes these options on its own
+
+    :param max_rows: Rows shown before a DataFrame is truncated
+    :param max_columns: Columns shown before a DataFrame is truncated
+    :param width: Characters per line
+    """
+    pd.set_option('display.max_rows', max_rows)
+    pd.set_option('display.max_columns', max_columns)
+    pd.set_option('display.width', width)
 
 class DataContainer:
     """
@@ -11,9 +26,58 @@ class DataContainer:
         Constructor class for DataContainer
         """
         self.df = df
+        # Bumped by every method that changes self.df, so results computed
+        # from an older frame are never reused
+        self._frame_version = 0
+        # (group column, aggregation spec, frame version): result, least
+        # recently used first
+        self._groupby_cache = OrderedDict()
+        self.groupby_cache_bytes = 2**26
 
         return
 
+    def frame_version(self):
+        """
+        Returns a value that changes whenever self.df changes through the
+        container's methods, or is replaced or resized
+        """
+        return (self._frame_version, id(self.df), self.df.shape)
+
+    def _bump_version(self):
+        """
+        Marks self.df as changed and empties the group-by cache
+        """
+        self._frame_version += 1
+        self._groupby_cache.clear()
+
+        return
+
+    def cached_groupby(self, by, spec, compute):
+        """
+        Returns a group-by result from the cache, or computes and stores it.
+        The cache is bounded by self.groupby_cache_bytes, evicting the least
+        recently used results first
+
+        :param by: The column grouped by
+        :param spec: Hashable description of the aggregation
+        :param compute: Function that returns the result when it isn't cached
+        :return: A copy of the result, so callers can change it freely
+        """
+        key = (by, spec, self.frame_version())
+        if key in self._groupby_cache:
+            self._groupby_cache.move_to_end(key)
+            return self._groupby_cache[key][0].copy()
+
+        result = compute()
+        size = result.memory_usage(deep=True).sum()
+        self._groupby_cache[key] = (result.copy(), size)
+        total = sum(item[1] for item in self._groupby_cache.values())
+        while total > self.groupby_cache_bytes and \
+            len(self._groupby_cache) > 0:
+            total -= self._groupby_cache.popitem(last=False)[1][1]
+
+        return result
+
 
     def data_object_col_merge(self, data_object, merge_col, on):
         """
@@ -22,8 +86,76 @@ class DataContainer:
         """
         self.df = self.df.merge(right=pd.DataFrame(data_object.df[merge_col]),
             on=on)
+        self._bump_version()
+        return
+
+
+    def attach_cols(self, data_object, cols, on, silence=True):
+        """
+        Maps columns of an aggregated Data object onto self.df by its group
+        key, all in one step. The key of each row is looked up in the
+        aggregate's index once, and every column is taken through those
+        positions, so self.df keeps its rows, order and index and is never
+        copied the way a merge per column copies it
+
+        :param data_object: Data object whose df is indexed by the group key
+        :param cols: List of columns of data_object.df to attach
+        :param on: The column of self.df holding the group key
+        :param silence: Whether or not to print the time taken and the size
+            of the attached columns
+        """
+        start = time.perf_counter()
+        # Rows whose key is not in the aggregate get missing values
+        positions = data_object.df.index.get_indexer(self.df[on])
+        for col in cols:
+            self.df[col] = pd.api.extensions.take(data_object.df[col].array,
+                positions, allow_fill=True)
+        self._bump_version()
+        elapsed = time.perf_counter() - start
+
+        if silence is False:
+            # Only the attached columns are measured, the frame is not copied
+            col_bytes = sum(self.df[col].memory_usage(deep=True, index=False)
+                            for col in cols)
+            print('%s: attached %d columns (%.2f MB) in %.2f ms' % (on,
+                  len(cols), col_bytes / 2**20, 1000 * elapsed))
+
         return
 
+    def column_sums(self, sum_dict):
+        """
+        Sums groups of columns into new columns all at once. Every column that
+        is summed is copied into one NumPy block once, and a matrix of which
+        columns belong to which sum is multiplied against it
+
+        A missing value makes its sums missing, the same as summing the
+        columns with .apply(sum, axis=1). Sums of integer columns stay integers
+
+        :param sum_dict: Dictionary of new column: list of columns to sum
+        :return: Nothing, the new columns are assigned in the function
+        """
+        sources = list(dict.fromkeys([col for cols in sum_dict.values()
+                                      for col in cols]))
+        position = {col: index for index, col in enumerate(sources)}
+        membership = np.zeros((len(sources), len(sum_dict)))
+        for new_index, cols in enumerate(sum_dict.values()):
+            for col in cols:
+                membership[position[col], new_index] += 1
+
+        block = self.df[sources].to_numpy(dtype=float)
+        missing = np.isnan(block)
+        sums = np.where(missing, 0, block) @ membership
+        sums[(missing @ membership) > 0] = np.nan
+        del block
+
+        for new_index, (new_col, cols) in enumerate(sum_dict.items()):
+            self.df[new_col] = sums[:, new_index]
+            if all(pd.api.types.is_integer_dtype(self.df[col])
+                   for col in cols):
+                self.df[new_col] = self.df[new_col].astype(np.int64)
+        self._bump_version()
+
+        return
 
     def _column_bin(self, **kwargs):
         """
@@ -39,6 +171,7 @@ class DataContainer:
         self.df[kwargs['new_col']] = pd.cut(self.df[kwargs['cut_col']],
                                             kwargs['bin_size'],
                                             labels=kwargs['labels'])
+        self._bump_version()
         return
 
     def _column_div(self, **kwargs):
@@ -52,6 +185,7 @@ class DataContainer:
         """
         self.df[kwargs['new_col']] = (self.df[kwargs['div_top']] /
                                       self.df[kwargs['div_bot']]).fillna(0)
+        self._bump_version()
 
         return
 
@@ -113,6 +247,7 @@ class DataContainer:
         """
         # axis = 1 represents dropping from columns. 0 would be index
         self.df.drop(col_list, axis=1, inplace=True)
+        self._bump_version()
 
         return
 
@@ -1,15 +1,42 @@
 from .DataContainer import DataContainer
+import importlib
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
-from matplotlib.pyplot import figure
-plt.rcParams.update({'font.size': 15})
-pd.set_option('display.max_rows', 500)
-pd.set_option('display.max_columns', 500)
-pd.set_option('display.width', 1000)
 from math import ceil
 
+# matplotlib settings, applied the first time matplotlib is used
+_rc_params = {'font.size': 15}
+
+class _LazyModule:
+    """
+    Stands in for a module and only imports it the first time one of its
+    attributes is used, so importing wdata doesn't import matplotlib
+    """
+    def __init__(self, name, setup=None):
+        self._name = name
+        self._setup = setup
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+            if self._setup is not None:
+                self._setup(self._module)
+        return getattr(self._module, attr)
+
+plt = _LazyModule('matplotlib.pyplot',
+    setup=lambda module: module.rcParams.update(_rc_params))
+ticker = _LazyModule('matplotlib.ticker')
+
+def _update_rc_params(params):
+    """
+    Updates the matplotlib settings, now if matplotlib is already imported
+    and otherwise once it is
+    """
+    _rc_params.update(params)
+    if plt._module is not None:
+        plt.rcParams.update(params)
+
 class Graph(DataContainer):
     """
     A class that inherits from DataContainer, designed to make graphing with
@@ -23,7 +50,7 @@ class Graph(DataContainer):
         self.figwidth=figwidth
         self.figheight=figheight
         if 'font_size' in kwargs:
-            plt.rcParams.update({'font.size': kwargs['font_size']})
+            _update_rc_params({'font.size': kwargs['font_size']})
         return
 
     def _create_plot(self, title, xlabel, ylabel, ax=None,
@@ -32,7 +59,8 @@ class Graph(DataContainer):
         Creates a single figure for matplotlib plots and then labels it
         """
         if ax == None:
-            ax = figure(figsize=(self.figwidth, self.figheight)).subplots(1)
+            ax = plt.figure(figsize=(self.figwidth,
+                self.figheight)).subplots(1)
 
         ax = self._plot_label(ax, title, xlabel, ylabel, orientation)
 
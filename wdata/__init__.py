@@ -2,3 +2,4 @@ from .DataContainer import *
 from .DataCleaner import *
 from .Graph import *
 from .Data import *
+from .ArtifactCache import *